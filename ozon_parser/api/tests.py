@@ -0,0 +1,143 @@
+from time import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.writers import invalidate_products
+from products.models import Product
+from products.tests import create_products
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductListTests(TestCase):
+    """Количество запросов к базе на эндпоинте списка продуктов."""
+
+    url = '/v1/products/'
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Создание продуктов для всех тестов."""
+        create_products(7)
+
+    def setUp(self) -> None:
+        """Очистка кэша ответов перед каждым тестом."""
+        cache.clear()
+
+    def test_list_queries(self) -> None:
+        """Страница списка выбирается без подсчета всех продуктов.
+
+        Первый запрос читает только саму страницу, повторный отдается из
+        кэша без обращения к базе.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'page_size': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 5)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'page_size': 5})
+        self.assertEqual(response.status_code, 200)
+
+    def test_next_page_queries(self) -> None:
+        """Следующая страница по курсору выбирается одним запросом."""
+        response = self.client.get(self.url, {'page_size': 5})
+        with self.assertNumQueries(1):
+            response = self.client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_not_modified_after_write(self) -> None:
+        """После записи продуктов If-Modified-Since не дает 304."""
+        response = self.client.get(self.url)
+        last_modified = response['Last-Modified']
+        self.assertEqual(
+            self.client.get(
+                self.url,
+                HTTP_IF_MODIFIED_SINCE=last_modified,
+            ).status_code,
+            304,
+        )
+        with mock.patch('core.writers.time', return_value=time() + 60):
+            invalidate_products()
+        response = self.client.get(
+            self.url,
+            HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_pages_with_equal_names(self) -> None:
+        """Страницы не теряют и не повторяют продукты с равными name и price.
+
+        Переход назад по ссылке previous возвращает ту же страницу.
+        """
+        Product.objects.update(name='Товар', price=100)
+        response = self.client.get(self.url, {'page_size': 3})
+        first = response.json()
+        pages = [first['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            pages.append(response.json()['results'])
+        self.assertEqual(
+            [product['image_url'] for page in pages for product in page],
+            [f'https://example.com/{index}.jpg' for index in range(1, 8)],
+        )
+        response = self.client.get(
+            self.client.get(first['next']).json()['previous'],
+        )
+        self.assertEqual(response.json()['results'], first['results'])
+        self.assertIsNone(response.json()['previous'])
+
+    def test_invalid_cursor(self) -> None:
+        """Неверный курсор дает 404."""
+        response = self.client.get(self.url, {'cursor': 'cD1bMV0='})
+        self.assertEqual(response.status_code, 404)
+
+    def test_filtered_list_queries(self) -> None:
+        """Фильтры и выбор полей не добавляют запросов."""
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url,
+                {'search': 'упаковка', 'fields': 'name,price'},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(
+            set(response.json()['results'][0]),
+            {'name', 'price'},
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MetricsResetTests(TestCase):
+    """Права на сброс метрик парсинга."""
+
+    url = '/v1/metrics/reset/'
+
+    def test_anonymous_cannot_reset(self) -> None:
+        """Анонимный запрос не сбрасывает метрики."""
+        with mock.patch('api.v1.views.metrics') as collector:
+            response = self.client.post(self.url)
+        self.assertIn(response.status_code, (401, 403))
+        collector.reset.assert_not_called()
+
+    @mock.patch('api.v1.views.resource_blocker')
+    @mock.patch('api.v1.views.memory_metrics')
+    @mock.patch('api.v1.views.metrics')
+    def test_admin_can_reset(self, *collectors: mock.Mock) -> None:
+        """Администратор сбрасывает метрики.
+
+        Args:
+            collectors: заглушки сборщиков метрик.
+        """
+        self.client.force_login(
+            User.objects.create_superuser('admin', password='admin'),
+        )
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 204)
+        for collector in collectors:
+            collector.reset.assert_called_once_with()
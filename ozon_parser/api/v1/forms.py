@@ -1,7 +1,98 @@
+from typing import List, cast
+
 from django import forms
+from django.db.models import Q, QuerySet
+
+from core.constants import (
+    MAX_FILTER_OZON_IDS,
+    MAX_PAGINATION_LOOKAHEAD,
+    MAX_SEARCH_LENGTH,
+)
+from products.models import ProductQuerySet
 
 
 class QueryForm(forms.Form):
     """Форма для валидации параметров запроса."""
 
     products_count = forms.IntegerField(max_value=50, min_value=0)
+    lookahead = forms.IntegerField(
+        max_value=MAX_PAGINATION_LOOKAHEAD,
+        min_value=1,
+    )
+    refresh = forms.BooleanField(required=False)
+    max_age = forms.IntegerField(min_value=0)
+
+
+class ProductFilterForm(forms.Form):
+    """Форма для валидации и применения фильтров списка товаров."""
+
+    min_price = forms.IntegerField(min_value=0, required=False)
+    max_price = forms.IntegerField(min_value=0, required=False)
+    has_discount = forms.NullBooleanField(required=False)
+    min_discount = forms.IntegerField(
+        max_value=100,
+        min_value=0,
+        required=False,
+    )
+    date_from = forms.DateTimeField(required=False)
+    date_to = forms.DateTimeField(required=False)
+    ozon_id = forms.CharField(required=False)
+    search = forms.CharField(max_length=MAX_SEARCH_LENGTH, required=False)
+
+    def clean_ozon_id(self) -> List[int]:
+        """Разбор списка id продуктов, перечисленных через запятую.
+
+        Returns:
+            Список id продуктов.
+
+        Raises:
+            ValidationError: если id не являются числами или их слишком
+                много.
+        """
+        ozon_ids = [
+            ozon_id.strip()
+            for ozon_id in self.cleaned_data['ozon_id'].split(',')
+            if ozon_id.strip()
+        ]
+        if not all(ozon_id.isdigit() for ozon_id in ozon_ids):
+            raise forms.ValidationError('Id должны быть числами')
+        if len(ozon_ids) > MAX_FILTER_OZON_IDS:
+            raise forms.ValidationError(
+                f'Можно передать не больше {MAX_FILTER_OZON_IDS} id',
+            )
+        return [int(ozon_id) for ozon_id in ozon_ids]
+
+    def filter(self, queryset: QuerySet) -> QuerySet:
+        """Применение фильтров к продуктам.
+
+        Args:
+            queryset: продукты.
+
+        Returns:
+            Отфильтрованные продукты.
+        """
+        data = self.cleaned_data
+        if data['min_price'] is not None:
+            queryset = queryset.filter(price__gte=data['min_price'])
+        if data['max_price'] is not None:
+            queryset = queryset.filter(price__lte=data['max_price'])
+        if data['has_discount'] is not None:
+            no_discount = Q(discount_percent=None) | Q(discount_percent=0)
+            queryset = queryset.filter(
+                ~no_discount if data['has_discount'] else no_discount,
+            )
+        if data['min_discount'] is not None:
+            queryset = queryset.filter(
+                discount_percent__gte=data['min_discount'],
+            )
+        if data['date_from'] is not None:
+            queryset = queryset.filter(request_date__gte=data['date_from'])
+        if data['date_to'] is not None:
+            queryset = queryset.filter(request_date__lte=data['date_to'])
+        if data['ozon_id']:
+            queryset = queryset.filter(ozon_id__in=data['ozon_id'])
+        if data['search']:
+            queryset = cast(ProductQuerySet, queryset).search(
+                data['search'],
+            )
+        return queryset
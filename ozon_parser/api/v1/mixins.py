@@ -1,4 +1,15 @@
-from rest_framework import mixins, viewsets
+from hashlib import sha1
+from typing import Any, Callable
+
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from core.constants import PRODUCTS_CACHE_TIMEOUT
+from core.writers import get_products_state
 
 
 class ListCreateRetrieveViewSet(
@@ -10,3 +21,101 @@ class ListCreateRetrieveViewSet(
     """Миксин с методами POST, GET, RETRIEVE."""
 
     pass
+
+
+class CachedReadMixin(viewsets.GenericViewSet):
+    """Миксин, кэширующий ответы GET до следующей записи данных.
+
+    ETag вычисляется по версии данных и адресу запроса, а
+    Last-Modified - по времени смены этой версии, поэтому повторные
+    запросы получают 304 или ответ из кэша без обращения к базе. Версия
+    данных меняется при записи продуктов. Подмешивается перед вьюсетом
+    с методами list и retrieve.
+    """
+
+    def get_cached_response(
+        self,
+        handler: Callable[..., Response],
+        request: HttpRequest,
+        *args: Any,
+        **kwargs: Any,
+    ) -> HttpResponse:
+        """Ответ из кэша, 304 или ответ обработчика.
+
+        Args:
+            handler: метод, формирующий ответ при промахе кэша.
+            request: передаваемый запрос.
+            args: позиционные аргументы обработчика.
+            kwargs: именованные аргументы обработчика.
+
+        Returns:
+            Ответ на запрос.
+        """
+        version, last_modified = get_products_state()
+        digest = sha1(
+            f'{version}:{request.build_absolute_uri()}:'
+            f'{request.META.get("HTTP_ACCEPT", "")}'.encode(),
+        ).hexdigest()
+        etag = quote_etag(digest)
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if not_modified is not None:
+            return not_modified
+        key = f'products:response:{digest}'
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, PRODUCTS_CACHE_TIMEOUT)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Vary'] = 'Accept'
+        return response
+
+    def list(
+        self,
+        request: HttpRequest,
+        *args: Any,
+        **kwargs: Any,
+    ) -> HttpResponse:
+        """Метод GET для списка с кэшированием ответа.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response со списком объектов.
+        """
+        return self.get_cached_response(
+            super().list,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(
+        self,
+        request: HttpRequest,
+        *args: Any,
+        **kwargs: Any,
+    ) -> HttpResponse:
+        """Метод RETRIEVE с кэшированием ответа.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response с объектом.
+        """
+        return self.get_cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
@@ -0,0 +1,178 @@
+import json
+from typing import Any, List, Optional, Sequence
+
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.request import Request
+
+from core.constants import (
+    MAX_PRODUCTS_PAGE_SIZE,
+    PRODUCTS_ORDERING,
+    PRODUCTS_PAGE_SIZE,
+)
+
+
+def get_keyset_filter(
+    ordering: Sequence[str],
+    position: Sequence[Any],
+    reverse: bool = False,
+) -> Q:
+    """Условие на строки после позиции в порядке сортировки.
+
+    Сравнение (a, b, c) > (x, y, z) раскрывается в
+    a > x OR a = x AND b > y OR a = x AND b = y AND c > z, а условие
+    a >= x на первое поле позволяет базе выбрать диапазон по составному
+    индексу.
+
+    Args:
+        ordering: поля сортировки по возрастанию.
+        position: значения полей сортировки у граничной строки.
+        reverse: выбирать ли строки перед позицией.
+
+    Returns:
+        Условие для filter.
+    """
+    lookup, bound = ('lt', 'lte') if reverse else ('gt', 'gte')
+    condition = Q()
+    for index, field in enumerate(ordering):
+        condition |= Q(
+            **dict(zip(ordering[:index], position[:index])),
+            **{f'{field}__{lookup}': position[index]},
+        )
+    return Q(**{f'{ordering[0]}__{bound}': position[0]}) & condition
+
+
+class ProductCursorPagination(CursorPagination):
+    """Пагинация списка продуктов по ключу сортировки.
+
+    Курсор хранит значения всех полей сортировки у граничной строки
+    страницы, а следующая страница выбирается условием на эти значения
+    без смещения. Поля сортировки вместе с уникальным id задают
+    уникальный ключ и совпадают с составным индексом модели Product,
+    поэтому время ответа не зависит ни от номера страницы, ни от числа
+    продуктов с одинаковым name.
+    """
+
+    ordering = PRODUCTS_ORDERING
+    page_size = PRODUCTS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PRODUCTS_PAGE_SIZE
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: Request,
+        view: Any = None,
+    ) -> Optional[List[Model]]:
+        """Выбор страницы продуктов по курсору.
+
+        Args:
+            queryset: продукты.
+            request: передаваемый запрос.
+            view: вьюсет, формирующий ответ.
+
+        Returns:
+            Продукты страницы или None, если пагинация отключена.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.decode_position(self.cursor)
+        queryset = queryset.order_by(
+            *(f'-{field}' if reverse else field for field in self.ordering),
+        )
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    get_keyset_filter(self.ordering, position, reverse),
+                )
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.position = self.cursor.position if self.cursor else None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def decode_position(self, cursor: Optional[Cursor]) -> Optional[list]:
+        """Получение значений полей сортировки из курсора.
+
+        Args:
+            cursor: курсор из запроса.
+
+        Returns:
+            Значения полей или None, если позиции в курсоре нет.
+
+        Raises:
+            NotFound: если позиция в курсоре неверна.
+        """
+        if cursor is None or cursor.position is None:
+            return None
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.ordering)
+            or None in position
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_position(self, instance: Model) -> str:
+        """Значения полей сортировки у продукта для курсора.
+
+        Args:
+            instance: граничный продукт страницы.
+
+        Returns:
+            Значения полей в JSON.
+        """
+        return json.dumps(
+            [getattr(instance, field) for field in self.ordering],
+            ensure_ascii=False,
+        )
+
+    def get_next_link(self) -> Optional[str]:
+        """Ссылка на следующую страницу.
+
+        Returns:
+            Адрес страницы или None, если страница последняя.
+        """
+        if not self.has_next:
+            return None
+        position = (
+            self.encode_position(self.page[-1]) if self.page else self.position
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position),
+        )
+
+    def get_previous_link(self) -> Optional[str]:
+        """Ссылка на предыдущую страницу.
+
+        Returns:
+            Адрес страницы или None, если страница первая.
+        """
+        if not self.has_previous:
+            return None
+        position = (
+            self.encode_position(self.page[0]) if self.page else self.position
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position),
+        )
@@ -0,0 +1,309 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+from importlib.util import find_spec
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+Batches = Iterable[List[Tuple[Any, ...]]]
+PARQUET_TYPES = {
+    'ozon_id': 'int64',
+    'price': 'int64',
+    'original_price': 'int64',
+    'discount_percent': 'int16',
+    'request_date': 'timestamp',
+}
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Рендерер потока server-sent events.
+
+    Сам поток формируется во вьюхе, а рендерер нужен для согласования
+    формата с заголовком Accept: text/event-stream и для ответов с
+    ошибками.
+    """
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Рендеринг ответа в виде одного события.
+
+        Args:
+            data: данные ответа.
+            accepted_media_type: согласованный тип данных.
+            renderer_context: контекст рендеринга.
+
+        Returns:
+            Событие с данными в формате JSON.
+        """
+        return f'data: {json.dumps(data)}\n\n'.encode(self.charset)
+
+
+class ExportRenderer(BaseRenderer, ABC):
+    """Базовый рендерер выгрузки продуктов потоком.
+
+    Выгрузка формируется методом stream по пачкам строк, а render
+    используется только для ответов с ошибками. У двоичных форматов
+    charset равен None.
+    """
+
+    charset: Optional[str] = 'utf-8'
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Рендеринг ответа, не являющегося выгрузкой.
+
+        Args:
+            data: данные ответа.
+            accepted_media_type: согласованный тип данных.
+            renderer_context: контекст рендеринга.
+
+        Returns:
+            Данные в формате JSON.
+        """
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def is_available(self) -> bool:
+        """Проверка, что для формата установлены все зависимости.
+
+        Returns:
+            True, если выгрузку в этом формате можно сформировать.
+        """
+        return True
+
+    def encode(self, text: str) -> bytes:
+        """Кодирование текста выгрузки.
+
+        Args:
+            text: часть выгрузки.
+
+        Returns:
+            Текст в кодировке charset.
+        """
+        return text.encode(self.charset or 'utf-8')
+
+    @abstractmethod
+    def stream(
+        self,
+        fields: Tuple[str, ...],
+        batches: Batches,
+    ) -> Iterator[bytes]:
+        """Формирование выгрузки.
+
+        Args:
+            fields: имена выгружаемых полей.
+            batches: пачки строк со значениями полей.
+
+        Yields:
+            Части файла выгрузки.
+        """
+
+
+class NDJSONRenderer(ExportRenderer):
+    """Выгрузка продуктов в формате NDJSON: один объект JSON в строке."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def stream(
+        self,
+        fields: Tuple[str, ...],
+        batches: Batches,
+    ) -> Iterator[bytes]:
+        """Формирование выгрузки.
+
+        Args:
+            fields: имена выгружаемых полей.
+            batches: пачки строк со значениями полей.
+
+        Yields:
+            Строки выгрузки, по пачке за раз.
+        """
+        for batch in batches:
+            yield self.encode(
+                ''.join(
+                    json.dumps(
+                        dict(zip(fields, row)),
+                        cls=DjangoJSONEncoder,
+                        ensure_ascii=False,
+                    )
+                    + '\n'
+                    for row in batch
+                ),
+            )
+
+
+class LineBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, line: str) -> str:
+        """Запись строки.
+
+        Args:
+            line: строка CSV.
+
+        Returns:
+            Ту же строку.
+        """
+        return line
+
+
+class CSVRenderer(ExportRenderer):
+    """Выгрузка продуктов в формате CSV с заголовком."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(
+        self,
+        fields: Tuple[str, ...],
+        batches: Batches,
+    ) -> Iterator[bytes]:
+        """Формирование выгрузки.
+
+        Args:
+            fields: имена выгружаемых полей.
+            batches: пачки строк со значениями полей.
+
+        Yields:
+            Заголовок и строки выгрузки, по пачке за раз.
+        """
+        writer = csv.writer(LineBuffer())
+        yield self.encode(writer.writerow(fields))
+        for batch in batches:
+            yield self.encode(
+                ''.join(
+                    writer.writerow(
+                        value.isoformat()
+                        if isinstance(value, datetime)
+                        else value
+                        for value in row
+                    )
+                    for row in batch
+                ),
+            )
+
+
+class StreamSink:
+    """Файл только для записи, отдающий записанное по частям.
+
+    Позиция в файле продолжает расти после выдачи данных, поэтому
+    смещения, которые записывает pyarrow, остаются верными.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        """Запись данных.
+
+        Args:
+            data: записываемые байты.
+
+        Returns:
+            Количество записанных байтов.
+        """
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        """Текущая позиция в файле.
+
+        Returns:
+            Количество записанных байтов.
+        """
+        return self.position
+
+    def flush(self) -> None:
+        """Сброс буфера; данные и так хранятся в памяти."""
+
+    def close(self) -> None:
+        """Закрытие файла."""
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """Выдача данных, записанных с прошлого вызова.
+
+        Returns:
+            Записанные байты.
+        """
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ParquetRenderer(ExportRenderer):
+    """Выгрузка продуктов в колоночном формате Parquet.
+
+    Каждая пачка строк записывается отдельной группой строк. Нужна
+    необязательная зависимость pyarrow.
+    """
+
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+    charset = None
+
+    def is_available(self) -> bool:
+        """Проверка, что установлен pyarrow.
+
+        Returns:
+            True, если выгрузку в Parquet можно сформировать.
+        """
+        return find_spec('pyarrow') is not None
+
+    def stream(
+        self,
+        fields: Tuple[str, ...],
+        batches: Batches,
+    ) -> Iterator[bytes]:
+        """Формирование выгрузки.
+
+        Args:
+            fields: имена выгружаемых полей.
+            batches: пачки строк со значениями полей.
+
+        Yields:
+            Части файла, по группе строк за раз, и в конце метаданные.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            'int64': pa.int64(),
+            'int16': pa.int16(),
+            'timestamp': pa.timestamp('us', tz='UTC'),
+        }
+        schema = pa.schema(
+            [
+                (field, types.get(PARQUET_TYPES.get(field, ''), pa.string()))
+                for field in fields
+            ],
+        )
+        sink = StreamSink()
+        with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as file:
+            for batch in batches:
+                file.write_table(
+                    pa.Table.from_pylist(
+                        [dict(zip(fields, row)) for row in batch],
+                        schema=schema,
+                    ),
+                )
+                yield sink.drain()
+        yield sink.drain()
@@ -1,5 +1,14 @@
+from typing import Any, Iterable, List, Optional
+
+from django.http import HttpRequest
 from rest_framework import serializers
 
+from core.constants import (
+    MAX_FILTER_OZON_IDS,
+    MAX_PAGINATION_LOOKAHEAD,
+    MAX_SEARCH_LENGTH,
+)
+from core.jobs import JOB_STATUSES
 from products.models import Product
 
 
@@ -14,12 +23,67 @@ class ProductWriteSerializer(serializers.ModelSerializer):
             'description',
             'image_url',
             'discount',
+            'original_price',
+            'discount_percent',
+            'currency',
             'ozon_id',
             'request_date',
         )
 
 
-class ProductReadSerializer(serializers.ModelSerializer):
+def get_sparse_fields(
+    request: Optional[HttpRequest],
+    allowed: Iterable[str],
+) -> Optional[List[str]]:
+    """Получение полей, перечисленных в параметре запроса fields.
+
+    Args:
+        request: передаваемый запрос.
+        allowed: поля, которые можно запросить.
+
+    Returns:
+        Список запрошенных полей или None, если параметр не передан.
+
+    Raises:
+        ValidationError: если запрошено неизвестное поле.
+    """
+    query_params = getattr(request, 'query_params', None)
+    if not query_params or not query_params.get('fields'):
+        return None
+    fields = [
+        field.strip()
+        for field in query_params['fields'].split(',')
+        if field.strip()
+    ]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise serializers.ValidationError(
+            {'fields': [f'Неизвестные поля: {", ".join(unknown)}']},
+        )
+    return fields
+
+
+class SparseFieldsetMixin(serializers.Serializer):
+    """Миксин, оставляющий в ответе только поля из параметра fields.
+
+    Подмешивается перед ModelSerializer или другим сериализатором.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        fields = get_sparse_fields(
+            self.context.get('request'),
+            self.fields.keys(),
+        )
+        if fields is not None:
+            for field in set(self.fields.keys()) - set(fields):
+                self.fields.pop(field)
+
+
+class ProductReadSerializer(
+    SparseFieldsetMixin,
+    serializers.ModelSerializer,
+):
     """Сериализатор для модели избранного."""
 
     class Meta:
@@ -30,6 +94,9 @@ class ProductReadSerializer(serializers.ModelSerializer):
             'description',
             'image_url',
             'discount',
+            'original_price',
+            'discount_percent',
+            'currency',
         )
 
 
@@ -41,3 +108,97 @@ class QuerySerializer(serializers.Serializer):
         min_value=0,
         help_text='Amount of products for parsing (default 10)',
     )
+    lookahead = serializers.IntegerField(
+        max_value=MAX_PAGINATION_LOOKAHEAD,
+        min_value=1,
+        required=False,
+        help_text='Amount of catalog pages fetched ahead (default 3)',
+    )
+    refresh = serializers.BooleanField(
+        required=False,
+        help_text='Re-parse stored products instead of new ones',
+    )
+    max_age = serializers.IntegerField(
+        min_value=0,
+        required=False,
+        help_text='Refresh products older than this many hours (default 24)',
+    )
+
+
+class JobSerializer(serializers.Serializer):
+    """Сериализатор для состояния задачи на парсинг."""
+
+    id = serializers.CharField()
+    url = serializers.CharField()
+    refresh = serializers.BooleanField()
+    status = serializers.ChoiceField(choices=JOB_STATUSES)
+    total = serializers.IntegerField(allow_null=True)
+    pages = serializers.IntegerField(help_text='Catalog pages scanned')
+    fetched = serializers.IntegerField(help_text='Product pages fetched')
+    saved = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    eta = serializers.IntegerField(
+        allow_null=True,
+        help_text='Estimated seconds left',
+    )
+    created_at = serializers.FloatField()
+    started_at = serializers.FloatField(allow_null=True)
+    finished_at = serializers.FloatField(allow_null=True)
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """Сериализатор для фильтров списка товаров."""
+
+    min_price = serializers.IntegerField(min_value=0, required=False)
+    max_price = serializers.IntegerField(min_value=0, required=False)
+    has_discount = serializers.BooleanField(
+        required=False,
+        allow_null=True,
+        help_text='Only products with (true) or without (false) discount',
+    )
+    min_discount = serializers.IntegerField(
+        max_value=100,
+        min_value=0,
+        required=False,
+        help_text='Only products with at least this discount percent',
+    )
+    date_from = serializers.DateTimeField(
+        required=False,
+        help_text='Products parsed at or after this date',
+    )
+    date_to = serializers.DateTimeField(
+        required=False,
+        help_text='Products parsed at or before this date',
+    )
+    ozon_id = serializers.CharField(
+        required=False,
+        help_text=f'Comma separated Ozon ids, up to {MAX_FILTER_OZON_IDS}',
+    )
+    search = serializers.CharField(
+        max_length=MAX_SEARCH_LENGTH,
+        required=False,
+        help_text='Full-text search in name and description',
+    )
+
+
+class ProductStatsSerializer(serializers.Serializer):
+    """Сериализатор для статистики цен продуктов."""
+
+    count = serializers.IntegerField()
+    discounted = serializers.IntegerField()
+    min_price = serializers.IntegerField(allow_null=True)
+    max_price = serializers.IntegerField(allow_null=True)
+    avg_price = serializers.FloatField(allow_null=True)
+
+
+class BatchStatsSerializer(ProductStatsSerializer):
+    """Сериализатор для статистики цен пачки продуктов."""
+
+    request_date = serializers.DateTimeField()
+
+
+class StatsSerializer(serializers.Serializer):
+    """Сериализатор для общей статистики и статистики по пачкам."""
+
+    total = ProductStatsSerializer()
+    batches = BatchStatsSerializer(many=True)
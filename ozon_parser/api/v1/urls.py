@@ -1,13 +1,15 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.v1.views import ProductViewSet
+from api.v1.views import JobViewSet, MetricsViewSet, ProductViewSet
 
 app_name = '%(app_label)s'
 
 router = DefaultRouter()
 
 router.register(r'products', ProductViewSet)
+router.register(r'jobs', JobViewSet, basename='jobs')
+router.register(r'metrics', MetricsViewSet, basename='metrics')
 
 urlpatterns = [
     path('', include(router.urls)),
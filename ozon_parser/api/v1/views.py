@@ -1,23 +1,81 @@
-from typing import Any
+import json
+from typing import Any, Dict, Iterator, cast
 
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.db.models import QuerySet
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBase
 from drf_yasg import openapi
 from drf_yasg.utils import no_body, swagger_auto_schema
-from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
 
-from api.v1.forms import QueryForm
-from api.v1.mixins import ListCreateRetrieveViewSet
-from api.v1.serializers import ProductReadSerializer, QuerySerializer
-from core.constants import OZON_SELLER_1_PRODUCTS
-from core.tasks import parse_ozon_seller
-from products.models import Product
+from api.v1.forms import ProductFilterForm, QueryForm
+from api.v1.mixins import CachedReadMixin, ListCreateRetrieveViewSet
+from api.v1.pagination import ProductCursorPagination
+from api.v1.renderers import (
+    CSVRenderer,
+    EventStreamRenderer,
+    ExportRenderer,
+    NDJSONRenderer,
+    ParquetRenderer,
+)
+from api.v1.serializers import (
+    JobSerializer,
+    ProductFilterSerializer,
+    ProductReadSerializer,
+    QuerySerializer,
+    StatsSerializer,
+    get_sparse_fields,
+)
+from core.blocking import resource_blocker
+from core.constants import (
+    DEFAULT_PRODUCTS_COUNT,
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FIELDS,
+    OZON_SELLER_1_PRODUCTS,
+    PAGINATION_LOOKAHEAD,
+    PRODUCTS_ORDERING,
+    REFRESH_MAX_AGE_HOURS,
+    STATS_BATCHES_LIMIT,
+)
+from core.jobs import get_job, watch_job
+from core.metrics import memory_metrics, metrics
+from core.tasks import start_parsing
+from products.models import Product, ProductQuerySet
 
 created_response = openapi.Response(
     'Created N objects',
     ProductReadSerializer(many=True),
 )
 
+job_response = openapi.Response(
+    'Parsing started or already running',
+    schema=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'job_id': openapi.Schema(type=openapi.TYPE_STRING),
+            'created': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+        },
+    ),
+)
+
+fields_parameter = openapi.Parameter(
+    'fields',
+    openapi.IN_QUERY,
+    description='Comma separated list of fields to return, e.g. name,price',
+    type=openapi.TYPE_STRING,
+)
+
 error_reponse = openapi.Response(
     description="Didn't manage to create objects",
     schema=openapi.Schema(
@@ -32,17 +90,48 @@ error_reponse = openapi.Response(
 )
 
 
-class ProductViewSet(ListCreateRetrieveViewSet):
+class ProductViewSet(CachedReadMixin, ListCreateRetrieveViewSet):
     """Вьюсет, обрабатывающий запросы к продуктам."""
 
     queryset = Product.objects.all()
     serializer_class = ProductReadSerializer
     permission_classes = [AllowAny]
+    pagination_class = ProductCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        """Получение продуктов с учетом фильтров и запрошенных полей.
+
+        Returns:
+            QuerySet продуктов.
+
+        Raises:
+            ValidationError: если фильтры заданы неверно.
+        """
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'stats', 'export'):
+            return queryset
+        filters = ProductFilterForm(self.request.query_params)
+        if not filters.is_valid():
+            raise ValidationError(filters.errors)
+        queryset = filters.filter(queryset)
+        if self.action != 'list':
+            return queryset
+        fields = get_sparse_fields(
+            self.request,
+            ProductReadSerializer.Meta.fields,
+        )
+        if fields is not None:
+            queryset = queryset.only(*fields, *PRODUCTS_ORDERING)
+        return queryset
 
     @swagger_auto_schema(
         tags=['PRODUCTS'],
         operation_id='GET PRODUCTS',
-        operation_description='Get products list',
+        operation_description=(
+            'Get products list page by page, ordered by name and price'
+        ),
+        manual_parameters=[fields_parameter],
+        query_serializer=ProductFilterSerializer,
     )
     def list(
         self,
@@ -64,6 +153,7 @@ class ProductViewSet(ListCreateRetrieveViewSet):
         tags=['PRODUCTS'],
         operation_id='RETRIEVE PRODUCT',
         operation_description='Get product by id',
+        manual_parameters=[fields_parameter],
     )
     def retrieve(
         self,
@@ -81,12 +171,117 @@ class ProductViewSet(ListCreateRetrieveViewSet):
         """
         return super().retrieve(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        tags=['PRODUCTS'],
+        operation_id='PRODUCTS STATS',
+        operation_description=(
+            'Get count and min/max/avg price of filtered products, overall '
+            f'and for the last {STATS_BATCHES_LIMIT} request batches'
+        ),
+        query_serializer=ProductFilterSerializer,
+        responses={status.HTTP_200_OK: StatsSerializer},
+    )
+    @action(detail=False)
+    def stats(self, request: HttpRequest) -> HttpResponse:
+        """Метод GET для статистики цен товаров.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response со статистикой по всем товарам и по пачкам.
+        """
+        return self.get_cached_response(self.get_stats, request)
+
+    @swagger_auto_schema(
+        tags=['PRODUCTS'],
+        operation_id='EXPORT PRODUCTS',
+        operation_description=(
+            'Stream all filtered products as NDJSON (default), CSV or '
+            'Parquet. Choose the format with ?format= or the Accept header. '
+            'Parquet requires pyarrow on the server'
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                description=(
+                    'Comma separated list of columns, by default all of '
+                    + ', '.join(EXPORT_FIELDS)
+                ),
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        query_serializer=ProductFilterSerializer,
+        responses={status.HTTP_200_OK: 'File with products'},
+    )
+    @action(
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer, ParquetRenderer],
+    )
+    def export(self, request: Request) -> HttpResponseBase:
+        """Метод GET для выгрузки товаров файлом.
+
+        Строки читаются из базы и отдаются пачками, поэтому расход
+        памяти не зависит от количества товаров.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            StreamingHttpResponse с файлом выгрузки.
+
+        Raises:
+            ValidationError: если формат недоступен или поля заданы
+                неверно.
+        """
+        renderer: ExportRenderer = request.accepted_renderer
+        if not renderer.is_available():
+            raise ValidationError(
+                {'format': [f'Формат {renderer.format} недоступен']},
+            )
+        fields = tuple(
+            get_sparse_fields(request, EXPORT_FIELDS) or EXPORT_FIELDS,
+        )
+        queryset = cast(ProductQuerySet, self.get_queryset())
+        batches = queryset.iter_batches(fields, EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            renderer.stream(fields, batches),
+            content_type=renderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="products.{renderer.format}"'
+        )
+        return response
+
+    def get_stats(self, request: HttpRequest) -> HttpResponse:
+        """Подсчет статистики цен товаров в базе.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response со статистикой по всем товарам и по пачкам.
+        """
+        queryset = cast(ProductQuerySet, self.get_queryset())
+        return Response(
+            StatsSerializer(
+                {
+                    'total': queryset.stats(),
+                    'batches': queryset.batch_stats()[:STATS_BATCHES_LIMIT],
+                },
+            ).data,
+        )
+
     @swagger_auto_schema(
         tags=['PRODUCTS'],
         operation_id='CREATE PRODUCTS',
         request_body=no_body,
-        operation_description='Start parsing from Ozon',
-        responses={status.HTTP_200_OK: 'Parsing started'},
+        operation_description=(
+            'Start parsing from Ozon. With refresh=true re-parse stored '
+            'products older than max_age hours, stalest first'
+        ),
+        responses={status.HTTP_200_OK: job_response},
         query_serializer=QuerySerializer,
     )
     def create(self, request: HttpRequest) -> HttpResponse:
@@ -96,14 +291,221 @@ class ProductViewSet(ListCreateRetrieveViewSet):
             request: передаваемый запрос.
 
         Returns:
-            Информацию об ошибках или статус-код 201.
+            Информацию об ошибках или id задачи на парсинг. Если
+            парсинг уже запущен, возвращается id запущенной задачи.
+        """
+        query = QueryForm(
+            {
+                'products_count': (
+                    request.GET.get('products_count') or DEFAULT_PRODUCTS_COUNT
+                ),
+                'lookahead': (
+                    request.GET.get('lookahead') or PAGINATION_LOOKAHEAD
+                ),
+                'refresh': request.GET.get('refresh'),
+                'max_age': (
+                    request.GET.get('max_age') or REFRESH_MAX_AGE_HOURS
+                ),
+            },
+        )
+        if not query.is_valid():
+            return JsonResponse(query.errors)
+        job_id, created = start_parsing(
+            OZON_SELLER_1_PRODUCTS,
+            query.cleaned_data['products_count'],
+            refresh=query.cleaned_data['refresh'],
+            lookahead=query.cleaned_data['lookahead'],
+            max_age=query.cleaned_data['max_age'],
+        )
+        return JsonResponse({'job_id': job_id, 'created': created})
+
+
+def get_job_events(job_id: str) -> Iterator[str]:
+    """Формирование server-sent events об изменениях задачи.
+
+    Args:
+        job_id: id задачи на парсинг.
+
+    Yields:
+        События progress с состоянием задачи.
+    """
+    for job in watch_job(job_id):
+        data = json.dumps(JobSerializer(job).data)
+        yield f'event: progress\ndata: {data}\n\n'
+
+
+class JobViewSet(viewsets.ViewSet):
+    """Вьюсет, обрабатывающий запросы к задачам на парсинг."""
+
+    permission_classes = [AllowAny]
+
+    def get_object(self, pk: str) -> Dict[str, Any]:
+        """Получение состояния задачи.
+
+        Args:
+            pk: id задачи.
+
+        Returns:
+            Состояние задачи.
+
+        Raises:
+            NotFound: если задача не найдена или устарела.
+        """
+        job = get_job(pk)
+        if job is None:
+            raise NotFound('Задача не найдена')
+        return job
+
+    @swagger_auto_schema(
+        tags=['JOBS'],
+        operation_id='RETRIEVE JOB',
+        operation_description=(
+            'Get parsing job progress: catalog pages scanned, products '
+            'fetched, saved and failed, estimated seconds left'
+        ),
+        responses={status.HTTP_200_OK: JobSerializer},
+    )
+    def retrieve(self, request: HttpRequest, pk: str) -> HttpResponse:
+        """Метод RETRIEVE для задачи на парсинг.
+
+        Args:
+            request: передаваемый запрос.
+            pk: id задачи.
+
+        Returns:
+            Response с состоянием задачи.
+        """
+        return Response(JobSerializer(self.get_object(pk)).data)
+
+    @swagger_auto_schema(
+        tags=['JOBS'],
+        operation_id='STREAM JOB',
+        operation_description=(
+            'Stream parsing job progress as server-sent events. '
+            'An event is sent on every change, the stream ends when '
+            'the job is finished or failed'
+        ),
+        responses={status.HTTP_200_OK: 'text/event-stream'},
+    )
+    @action(
+        detail=True,
+        renderer_classes=[EventStreamRenderer, JSONRenderer],
+    )
+    def stream(self, request: HttpRequest, pk: str) -> HttpResponseBase:
+        """Поток событий об изменениях задачи на парсинг.
+
+        Args:
+            request: передаваемый запрос.
+            pk: id задачи.
+
+        Returns:
+            StreamingHttpResponse с server-sent events.
+        """
+        self.get_object(pk)
+        response = StreamingHttpResponse(
+            get_job_events(pk),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class MetricsViewSet(viewsets.ViewSet):
+    """Вьюсет с гистограммами длительности этапов парсинга."""
+
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        tags=['METRICS'],
+        operation_id='LIST METRICS',
+        operation_description=(
+            'Get per-task histograms of parsing stage durations: '
+            'driver start, page navigation and readiness wait, '
+            'extraction, validation and writes. Durations are in seconds, '
+            'p50 and p95 are estimated from the buckets'
+        ),
+        responses={status.HTTP_200_OK: 'Histograms by task and stage'},
+    )
+    def list(self, request: HttpRequest) -> HttpResponse:
+        """Метод GET для гистограмм.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response с гистограммами по задачам и этапам.
+        """
+        return Response(metrics.collect())
+
+    @swagger_auto_schema(
+        tags=['METRICS'],
+        operation_id='MEMORY METRICS',
+        operation_description=(
+            'Get per-task histograms of memory use in MB: worker RSS after '
+            'a task, worker RSS growth during a task and browser RSS '
+            'after each page'
+        ),
+        responses={status.HTTP_200_OK: 'Histograms by task and stage'},
+    )
+    @action(detail=False)
+    def memory(self, request: HttpRequest) -> HttpResponse:
+        """Метод GET для гистограмм памяти.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response с гистограммами по задачам и этапам.
+        """
+        return Response(memory_metrics.collect())
+
+    @swagger_auto_schema(
+        tags=['METRICS'],
+        operation_id='BLOCKING METRICS',
+        operation_description=(
+            'Compare pages loaded with blocked images, media, fonts and '
+            'third-party scripts to sampled pages loaded in full: pages, '
+            'mean KB transferred and mean seconds until ready per page '
+            'type, and KB and seconds saved per page'
+        ),
+        responses={status.HTTP_200_OK: 'Comparison by page type'},
+    )
+    @action(detail=False)
+    def blocking(self, request: HttpRequest) -> HttpResponse:
+        """Метод GET для сравнения загрузок с запретом ресурсов и без.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Response со сравнением по типам страниц.
+        """
+        return Response(resource_blocker.collect())
+
+    @swagger_auto_schema(
+        tags=['METRICS'],
+        operation_id='RESET METRICS',
+        operation_description=(
+            'Delete all collected histograms. Admin users only'
+        ),
+        request_body=no_body,
+        responses={status.HTTP_204_NO_CONTENT: 'Histograms deleted'},
+    )
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def reset(self, request: HttpRequest) -> HttpResponse:
+        """Удаление накопленных гистограмм.
+
+        Доступно только администраторам: сброс стирает данные, которые
+        собирают все воркеры.
+
+        Args:
+            request: передаваемый запрос.
+
+        Returns:
+            Пустой Response.
         """
-        products_count = request.GET.get('products_count')
-        if products_count:
-            query = QueryForm({'products_count': products_count})
-            if not query.is_valid():
-                return JsonResponse(query.errors)
-        else:
-            products_count = '10'
-        parse_ozon_seller.delay(OZON_SELLER_1_PRODUCTS, int(products_count))
-        return HttpResponse(status=status.HTTP_200_OK)
+        metrics.reset()
+        memory_metrics.reset()
+        resource_blocker.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,3 +1,6 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Subquery
 from telegram import ReplyKeyboardMarkup, Update
 from telegram.ext import (
     Application,
@@ -7,24 +10,33 @@ from telegram.ext import (
     filters,
 )
 
+from core.constants import BOT_MESSAGE_TIMEOUT
 from core.utils import get_ozon_product_url
+from core.writers import get_products_version
 from products.models import Product
 
 
-async def get_latest_products(
-    update: Update,
-    context: ContextTypes.DEFAULT_TYPE,
-) -> None:
-    """Функция для вывода сообщением последних добавленных данных.
+def get_latest_message() -> str:
+    """Формирование сообщения с последними добавленными товарами.
 
-    Args:
-        update: Класс, содержащий обновления из Telegram.
-        context: контекст.
+    Сообщение кэшируется до следующей записи товаров, поэтому повторные
+    запросы не обращаются к базе. Последняя пачка выбирается одним
+    запросом с подзапросом на дату.
+
+    Returns:
+        Текст сообщения.
     """
-    chat_id = update.effective_message.chat_id  # type: ignore[union-attr]
+    key = f'bot:latest_products:{get_products_version()}'
+    message = cache.get(key)
+    if message is not None:
+        return message
     latest_products = list(
         Product.objects.filter(
-            request_date=Product.objects.latest('request_date').request_date,
+            request_date=Subquery(
+                Product.objects.order_by('-request_date').values(
+                    'request_date',
+                )[:1],
+            ),
         ).values('name', 'ozon_id'),
     )
     message = '\n'.join(
@@ -36,6 +48,23 @@ async def get_latest_products(
             for iterator in range(len(latest_products))
         ],
     )
+    message = message or 'Товаров пока нет'
+    cache.set(key, message, BOT_MESSAGE_TIMEOUT)
+    return message
+
+
+async def get_latest_products(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+) -> None:
+    """Функция для вывода сообщением последних добавленных данных.
+
+    Args:
+        update: Класс, содержащий обновления из Telegram.
+        context: контекст.
+    """
+    chat_id = update.effective_message.chat_id  # type: ignore[union-attr]
+    message = await sync_to_async(get_latest_message)()
     await context.bot.send_message(
         chat_id=chat_id,
         text=message,
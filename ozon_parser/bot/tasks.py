@@ -1,14 +1,51 @@
-from bot.utils import sync_send_message
+import redis
+from django.conf import settings
+
+from bot.utils import split_digest, telegram_client
+from core.constants import NOTIFY_WINDOW
 from ozon_parser.celery import app, logger
 
+PENDING_KEY = 'notifications:pending'
+SCHEDULED_KEY = 'notifications:scheduled'
 
-@app.task
-def send_message(message: str) -> None:
-    """Функция для отправления сообщения в заданный чат.
+queue = redis.Redis.from_url(settings.NOTIFICATIONS_URL, decode_responses=True)
+
+
+def notify(message: str, window: int = NOTIFY_WINDOW) -> None:
+    """Постановка сообщения в очередь оповещений Telegram.
+
+    Сообщения, поступившие в течение window секунд, отправляются одной
+    сводкой задачей flush_notifications. Задача ставится в очередь
+    только для первого сообщения окна.
 
     Args:
         message: сообщение, которое необходимо отправить.
+        window: длительность окна объединения в секундах.
     """
-    logger.info('Отправляю сообщение в телеграм')
-    sync_send_message(message)
-    logger.info('Сообщение в телеграм отправлено')
+    try:
+        queue.rpush(PENDING_KEY, message)
+        scheduled = queue.set(SCHEDULED_KEY, 1, nx=True, ex=window * 6)
+    except redis.RedisError as err:
+        logger.error(f'Очередь оповещений недоступна: {err}')
+        return
+    if scheduled:
+        flush_notifications.apply_async(countdown=window)
+
+
+@app.task
+def flush_notifications() -> None:
+    """Отправка накопленных сообщений сводками в заданный чат."""
+    with queue.pipeline() as pipeline:
+        pipeline.delete(SCHEDULED_KEY)
+        pipeline.lrange(PENDING_KEY, 0, -1)
+        pipeline.delete(PENDING_KEY)
+        _, messages, _ = pipeline.execute()
+    if not messages:
+        return
+    digests = split_digest(messages)
+    logger.info(
+        f'Отправляю в телеграм {len(messages)} сообщений '
+        f'в {len(digests)} сводках',
+    )
+    for digest in digests:
+        telegram_client.send(digest)
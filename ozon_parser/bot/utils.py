@@ -1,20 +1,140 @@
-from asyncio import new_event_loop, set_event_loop
+import threading
+from asyncio import AbstractEventLoop, new_event_loop
+from time import monotonic, sleep
+from typing import Any, Iterable, List, Optional
 
-from telegram.error import TelegramError
+from celery.signals import worker_process_shutdown, worker_shutdown
+from telegram import Bot
+from telegram.error import RetryAfter, TelegramError
 
-from bot.bot import CHAT_ID, bot
+from bot.bot import CHAT_ID, TOKEN
+from core.constants import (
+    TELEGRAM_MESSAGE_LIMIT,
+    TELEGRAM_RETRIES,
+    TELEGRAM_SEND_INTERVAL,
+)
 from ozon_parser.celery import logger
 
 
+class TelegramClient:
+    """Клиент Telegram с одним циклом событий на процесс.
+
+    Цикл и бот создаются при первой отправке и используются повторно.
+    Между сообщениями выдерживается интервал, а при ответе RetryAfter
+    отправка повторяется после указанной Telegram паузы.
+    """
+
+    def __init__(
+        self,
+        token: str = TOKEN,
+        chat_id: str = CHAT_ID,
+        interval: float = TELEGRAM_SEND_INTERVAL,
+    ) -> None:
+        self.token = token
+        self.chat_id = chat_id
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._loop: Optional[AbstractEventLoop] = None
+        self._bot: Optional[Bot] = None
+        self._last_sent = 0.0
+
+    def _get_bot(self) -> Bot:
+        if self._bot is None:
+            self._loop = new_event_loop()
+            self._bot = Bot(self.token)
+        return self._bot
+
+    def send(self, message: str) -> bool:
+        """Отправка сообщения в чат с учетом ограничений Telegram.
+
+        Args:
+            message: сообщение, которое требуется передать.
+
+        Returns:
+            True, если сообщение отправлено.
+        """
+        with self._lock:
+            for _ in range(TELEGRAM_RETRIES + 1):
+                delay = self._last_sent + self.interval - monotonic()
+                if delay > 0:
+                    sleep(delay)
+                try:
+                    bot = self._get_bot()
+                    self._loop.run_until_complete(  # type: ignore[union-attr]
+                        bot.send_message(self.chat_id, message),
+                    )
+                except RetryAfter as err:
+                    logger.warning(
+                        f'Telegram просит подождать {err.retry_after} секунд',
+                    )
+                    self._last_sent = monotonic() + float(err.retry_after)
+                    continue
+                except TelegramError as err:
+                    logger.error(f'Error sending message to Telegram: {err}')
+                    return False
+                finally:
+                    self._last_sent = max(self._last_sent, monotonic())
+                return True
+        return False
+
+    def close(self) -> None:
+        """Закрытие соединений бота и цикла событий."""
+        with self._lock:
+            if self._bot is None or self._loop is None:
+                return
+            try:
+                self._loop.run_until_complete(self._bot.shutdown())
+            except TelegramError as err:
+                logger.warning(f'Не удалось закрыть бота: {err}')
+            self._loop.close()
+            self._bot = None
+            self._loop = None
+
+
+telegram_client = TelegramClient()
+
+
+def split_digest(
+    messages: Iterable[str],
+    limit: int = TELEGRAM_MESSAGE_LIMIT,
+) -> List[str]:
+    """Объединение сообщений в сводки не длиннее лимита Telegram.
+
+    Args:
+        messages: сообщения в порядке поступления.
+        limit: максимальная длина одного сообщения.
+
+    Returns:
+        Список сводок.
+    """
+    digests: List[str] = []
+    current = ''
+    for message in messages:
+        message = message[:limit]
+        if current and len(current) + len(message) + 2 > limit:
+            digests.append(current)
+            current = ''
+        current = f'{current}\n\n{message}' if current else message
+    if current:
+        digests.append(current)
+    return digests
+
+
 def sync_send_message(message: str) -> None:
     """Функция для синхронного отправления сообщения.
 
     Args:
         message: сообщение, которое требуется передать.
     """
-    try:
-        loop = new_event_loop()
-        set_event_loop(loop)
-        loop.run_until_complete(bot.send_message(CHAT_ID, message))
-    except TelegramError as e:
-        logger.error(f'Error sending message to Telegram: {e}')
+    telegram_client.send(message)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_telegram_client(**kwargs: Any) -> None:
+    """Закрытие клиента Telegram при остановке воркера Celery.
+
+    Args:
+        kwargs: аргументы сигнала.
+    """
+    telegram_client.close()
@@ -0,0 +1,196 @@
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Pattern
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from fake_useragent import UserAgent
+from requests.adapters import HTTPAdapter
+
+from core.constants import (
+    HTTP_HISTORY_SIZE,
+    HTTP_MIN_ATTEMPTS,
+    HTTP_MIN_SUCCESS_RATE,
+    HTTP_POOL_SIZE,
+    HTTP_PROBE_INTERVAL,
+    HTTP_TIMEOUT,
+)
+from core.pool import DriverPool, driver_pool
+from core.readiness import is_throttled
+from core.utils import get_html
+from ozon_parser.celery import logger
+
+
+@lru_cache(maxsize=None)
+def compile_selector(css_selector: str) -> Pattern:
+    """Компиляция селектора вида tag.class в регулярное выражение.
+
+    Args:
+        css_selector: css-селектор из одного тега и одного класса.
+
+    Returns:
+        Выражение, находящее открывающий тег с этим классом.
+    """
+    tag, _, css_class = css_selector.partition('.')
+    return re.compile(
+        rf'<{re.escape(tag)}\b[^>]*\bclass="[^"]*'
+        rf'(?<![\w-]){re.escape(css_class)}(?![\w-])',
+    )
+
+
+def has_selector(html: str, css_selector: str = '') -> bool:
+    """Проверка, что в html без выполнения JS есть нужный элемент.
+
+    Args:
+        html: html страницы.
+        css_selector: селектор, появление которого ожидается.
+
+    Returns:
+        True, если элемент найден или селектор не задан.
+    """
+    if not css_selector:
+        return True
+    return compile_selector(css_selector).search(html) is not None
+
+
+class HttpBackend:
+    """Загрузка страниц обычным HTTP-запросом через пул соединений."""
+
+    name = 'http'
+
+    def __init__(
+        self,
+        timeout: float = HTTP_TIMEOUT,
+        pool_size: int = HTTP_POOL_SIZE,
+    ) -> None:
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = UserAgent().chrome
+
+    def fetch(self, url: str, css_selector: str = '') -> Optional[str]:
+        """Загрузка страницы без браузера.
+
+        Args:
+            url: адрес страницы.
+            css_selector: селектор, который должен быть в ответе.
+
+        Returns:
+            html страницы или None, если без браузера не обойтись.
+        """
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as err:
+            logger.info(f'Не удалось загрузить {url} без браузера: {err}')
+            return None
+        if response.status_code != requests.codes.ok:
+            return None
+        html = response.text
+        if is_throttled(html) or not has_selector(html, css_selector):
+            return None
+        return html
+
+
+class BrowserBackend:
+    """Загрузка страниц драйвером Chrome из пула."""
+
+    name = 'browser'
+
+    def __init__(self, pool: DriverPool = driver_pool) -> None:
+        self.pool = pool
+
+    def fetch(self, url: str, css_selector: str = '') -> str:
+        """Загрузка страницы в браузере.
+
+        Args:
+            url: адрес страницы.
+            css_selector: селектор, появление которого ожидается.
+
+        Returns:
+            html страницы.
+        """
+        with self.pool.driver() as driver:
+            return get_html(driver, url, css_selector)
+
+
+class BackendHistory:
+    """Статистика успешности загрузки без браузера по шаблонам адресов.
+
+    Если для шаблона HTTP-загрузка обычно не удается, она пропускается,
+    но раз в probe_interval пропусков пробуется снова.
+    """
+
+    def __init__(
+        self,
+        min_attempts: int = HTTP_MIN_ATTEMPTS,
+        min_success_rate: float = HTTP_MIN_SUCCESS_RATE,
+        probe_interval: int = HTTP_PROBE_INTERVAL,
+        history_size: int = HTTP_HISTORY_SIZE,
+    ) -> None:
+        self.min_attempts = min_attempts
+        self.min_success_rate = min_success_rate
+        self.probe_interval = probe_interval
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._stats: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def pattern(url: str) -> str:
+        """Шаблон адреса: числа заменены, значения параметров отброшены.
+
+        Args:
+            url: адрес страницы.
+
+        Returns:
+            Шаблон адреса.
+        """
+        parts = urlsplit(url)
+        keys = sorted(key for key, _ in parse_qsl(parts.query))
+        path = re.sub(r'\d+', '{id}', parts.netloc + parts.path)
+        return path + ('?' + '&'.join(keys) if keys else '')
+
+    def should_try_http(self, url: str) -> bool:
+        """Решение, пробовать ли загрузку без браузера.
+
+        Args:
+            url: адрес страницы.
+
+        Returns:
+            True, если стоит начать с HTTP-запроса.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(self.pattern(url), [0, 0, 0])
+            successes, attempts, skipped = stats
+            if (
+                attempts < self.min_attempts
+                or successes >= attempts * self.min_success_rate
+            ):
+                return True
+            stats[2] = (skipped + 1) % self.probe_interval
+            return stats[2] == 0
+
+    def record(self, url: str, success: bool) -> None:
+        """Учет результата загрузки без браузера.
+
+        Args:
+            url: адрес страницы.
+            success: удалось ли обойтись без браузера.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(self.pattern(url), [0, 0, 0])
+            stats[0] += int(success)
+            stats[1] += 1
+            if stats[1] > self.history_size:
+                stats[0] //= 2
+                stats[1] //= 2
+
+
+http_backend = HttpBackend()
+browser_backend = BrowserBackend()
+backend_history = BackendHistory()
@@ -0,0 +1,199 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+from selenium.common.exceptions import WebDriverException
+
+from core.constants import (
+    BLOCKED_RESOURCES,
+    RESOURCE_ALLOWLIST,
+    RESOURCE_BLOCKING_SAMPLE,
+)
+from ozon_parser.celery import logger
+
+BLOCKING_PREFIX = 'blocking'
+BLOCKING_MODES = ('blocked', 'full')
+TRANSFER_SIZE_SCRIPT = """
+const entries = performance.getEntriesByType('navigation')
+    .concat(performance.getEntriesByType('resource'));
+return entries.reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+
+def get_blocked_urls(
+    allowed: Iterable[str],
+    resources: Dict[str, Tuple[str, ...]] = BLOCKED_RESOURCES,
+) -> List[str]:
+    """Шаблоны адресов, загрузка которых запрещается.
+
+    Args:
+        allowed: разрешенные группы ресурсов.
+        resources: шаблоны адресов по группам ресурсов.
+
+    Returns:
+        Шаблоны адресов всех неразрешенных групп.
+    """
+    allowed = set(allowed)
+    return [
+        pattern
+        for group, patterns in resources.items()
+        if group not in allowed
+        for pattern in patterns
+    ]
+
+
+class ResourceBlocker:
+    """Запрет загрузки картинок, шрифтов, видео и сторонних скриптов.
+
+    Запрет настраивается через CDP перед каждым переходом по типу
+    страницы: группы из RESOURCE_ALLOWLIST загружаются, остальные
+    группы BLOCKED_RESOURCES - нет. Для типов страниц, которых нет в
+    RESOURCE_ALLOWLIST, ничего не запрещается.
+
+    Одна из каждых sample страниц типа загружается без запрета, чтобы
+    сравнить объем загруженных данных и время до готовности страницы.
+    Итоги сравнения хранятся в Redis и общие для всех воркеров.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.METRICS_URL,
+        allowlist: Dict[str, Tuple[str, ...]] = RESOURCE_ALLOWLIST,
+        sample: int = RESOURCE_BLOCKING_SAMPLE,
+    ) -> None:
+        self.redis = redis.Redis.from_url(url)
+        self.profiles = {
+            page_type: get_blocked_urls(allowed)
+            for page_type, allowed in allowlist.items()
+        }
+        self.sample = sample
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+
+    def apply(self, driver: Any, page_type: str) -> Optional[bool]:
+        """Настройка запрета перед переходом на страницу.
+
+        Шаблоны отправляются браузеру, только если они изменились с
+        прошлого перехода этого драйвера, поэтому запрет снимается и
+        перед переходом на страницу типа без запрета.
+
+        Args:
+            driver: используемый драйвер.
+            page_type: тип страницы.
+
+        Returns:
+            True, если запрет действует, False, если страница
+            загружается целиком для сравнения, и None, если для типа
+            страницы запрета нет.
+        """
+        urls = self.profiles.get(page_type, [])
+        blocked = None
+        if urls:
+            with self._lock:
+                count = self._counters.get(page_type, 0) + 1
+                self._counters[page_type] = count
+            blocked = not (self.sample and count % self.sample == 0)
+            if not blocked:
+                urls = []
+        if getattr(driver, 'blocked_urls', []) != urls:
+            try:
+                driver.execute_cdp_cmd(
+                    'Network.setBlockedURLs',
+                    {'urls': urls},
+                )
+            except (AttributeError, WebDriverException) as err:
+                logger.warning(f'Не удалось настроить запрет загрузки: {err}')
+                return None
+            driver.blocked_urls = urls
+        return blocked
+
+    def record(
+        self,
+        driver: Any,
+        page_type: str,
+        blocked: Optional[bool],
+        seconds: float,
+    ) -> None:
+        """Учет объема данных и времени загрузки страницы.
+
+        Объем считается по Resource Timing, поэтому ресурсы сторонних
+        сайтов без Timing-Allow-Origin не учитываются.
+
+        Args:
+            driver: используемый драйвер.
+            page_type: тип страницы.
+            blocked: результат apply для этой загрузки.
+            seconds: время до готовности страницы.
+        """
+        if blocked is None:
+            return
+        try:
+            size = driver.execute_script(TRANSFER_SIZE_SCRIPT)
+        except WebDriverException:
+            return
+        if not isinstance(size, (int, float)):
+            return
+        key = f'{BLOCKING_PREFIX}:{page_type}:{BLOCKING_MODES[not blocked]}'
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.hincrby(key, 'pages', 1)
+        pipeline.hincrby(key, 'bytes', int(size))
+        pipeline.hincrbyfloat(key, 'seconds', seconds)
+        try:
+            pipeline.execute()
+        except redis.RedisError as err:
+            logger.warning(f'Не удалось сохранить объем загрузки: {err}')
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Сравнение загрузок с запретом и без по типам страниц.
+
+        Returns:
+            Словарь тип страницы -> количество страниц, средний объем
+            в КБ и среднее время в секундах для каждого режима, а также
+            сэкономленные на странице КБ и секунды, если есть оба режима.
+        """
+        report: Dict[str, Dict[str, Any]] = {}
+        for page_type in self.profiles:
+            pipeline = self.redis.pipeline(transaction=False)
+            for mode in BLOCKING_MODES:
+                pipeline.hgetall(f'{BLOCKING_PREFIX}:{page_type}:{mode}')
+            modes = {}
+            for mode, values in zip(BLOCKING_MODES, pipeline.execute()):
+                pages = int(values.get(b'pages', 0))
+                if not pages:
+                    continue
+                modes[mode] = {
+                    'pages': pages,
+                    'kb': round(int(values[b'bytes']) / 1024 / pages, 1),
+                    'seconds': round(float(values[b'seconds']) / pages, 3),
+                }
+            if not modes:
+                continue
+            report[page_type] = modes
+            if len(modes) == len(BLOCKING_MODES):
+                report[page_type]['saved'] = {
+                    'kb': round(
+                        modes['full']['kb'] - modes['blocked']['kb'],
+                        1,
+                    ),
+                    'seconds': round(
+                        modes['full']['seconds'] - modes['blocked']['seconds'],
+                        3,
+                    ),
+                }
+        return report
+
+    def reset(self) -> None:
+        """Удаление итогов сравнения."""
+        if not self.profiles:
+            return
+        self.redis.delete(
+            *(
+                f'{BLOCKING_PREFIX}:{page_type}:{mode}'
+                for page_type in self.profiles
+                for mode in BLOCKING_MODES
+            ),
+        )
+
+
+resource_blocker = ResourceBlocker()
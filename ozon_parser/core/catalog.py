@@ -0,0 +1,244 @@
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Deque, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from core.constants import (
+    DATA_TAGS,
+    PAGINATION_LOOKAHEAD,
+    REFRESH_MAX_AGE_HOURS,
+    SELLER_PAGE_MARK,
+)
+from core.fetch import fetch_page
+from core.metrics import bind_context, metrics
+from core.utils import extend_with_unique, get_ozon_ids
+from ozon_parser.celery import logger
+from products.models import Product
+
+
+def count_pages(url: str) -> Tuple[int, str]:
+    """Функция для определения количества страниц в пагинаторе ozon.
+
+    Args:
+        url: адрес главной страницы.
+
+    Returns:
+        Количество страниц в пагинаторе ozon.
+    """
+    html = fetch_page(url, SELLER_PAGE_MARK)
+    pages_count = int(
+        re.search(  # type: ignore[union-attr]
+            r'"totalPages":(\d+)',
+            html,
+        )
+        .group(1)
+        .strip("'"),
+    )
+    logger.info(f'Обнаружено страниц: {pages_count}')
+    return pages_count, html
+
+
+CATALOG_STRAINER = SoupStrainer(
+    DATA_TAGS['products']['tag'],
+    {'class': DATA_TAGS['products']['class']},
+)
+
+
+def parse_catalog_ids(html: str) -> List[int]:
+    """Получение id товаров из html страницы каталога.
+
+    Дерево строится только для блока со списком товаров, а после
+    извлечения id сразу разрушается, чтобы не держать его в памяти.
+
+    Args:
+        html: html страницы каталога.
+
+    Returns:
+        Список id товаров со страницы.
+    """
+    with metrics.span('parse.catalog'):
+        soup = BeautifulSoup(html, 'lxml', parse_only=CATALOG_STRAINER)
+        try:
+            return get_ozon_ids(soup)
+        finally:
+            soup.decompose()
+
+
+def filter_new_ids(ozon_ids: List[int]) -> List[int]:
+    """Отбор id товаров, которых еще нет в базе.
+
+    Проверяются только переданные id одним запросом по уникальному
+    индексу ozon_id, поэтому таблица целиком в память не загружается.
+
+    Args:
+        ozon_ids: id товаров со страницы.
+
+    Returns:
+        Новые id в исходном порядке.
+    """
+    if not ozon_ids:
+        return []
+    created_ids = set(
+        Product.objects.filter(ozon_id__in=ozon_ids)
+        .order_by()
+        .values_list('ozon_id', flat=True),
+    )
+    return [ozon_id for ozon_id in ozon_ids if ozon_id not in created_ids]
+
+
+def get_ozon_ids_on_page(url: str) -> List[int]:
+    """Метод получения id товаров на странице каталога.
+
+    Args:
+        url: требуемый адрес страницы.
+
+    Returns:
+        Список id товаров со страницы.
+    """
+    return parse_catalog_ids(fetch_page(url, SELLER_PAGE_MARK))
+
+
+def get_new_products_on_first_page(html: str) -> List[int]:
+    """Метод получения новых продуктов на главной странице.
+
+    Args:
+        html: html главной страницы.
+
+    Returns:
+        Список новых продуктов
+    """
+    return filter_new_ids(parse_catalog_ids(html))
+
+
+def get_new_products(
+    url: str,
+    html: str,
+    pages_count: int,
+    products_count: int,
+    lookahead: int = PAGINATION_LOOKAHEAD,
+    on_page: Optional[Callable[[], None]] = None,
+) -> List[int]:
+    """Метод получения новых продуктов на сайте.
+
+    Следующие lookahead страниц пагинатора загружаются заранее и
+    параллельно, а результаты обрабатываются строго по порядку страниц.
+    Проверка на существование в базе выполняется в основном потоке.
+    Как только набрано products_count товаров, еще не начатые загрузки
+    отменяются.
+
+    Args:
+        url: адрес главной страницы.
+        html: html главной страницы.
+        pages_count: количество страниц в пагинаторе.
+        products_count: необходимое количество новых продуктов.
+        lookahead: количество страниц, загружаемых наперед.
+        on_page: функция, вызываемая после обработки каждой страницы
+            пагинатора, кроме первой.
+
+    Returns:
+        Список новых продуктов
+    """
+    new_ids = get_new_products_on_first_page(html)
+    logger.info(f'Количество новых элементов на странице: {len(new_ids)}')
+    if len(new_ids) >= products_count:
+        return new_ids[:products_count]
+    pages = iter(range(2, pages_count + 1))
+    lookahead = max(1, lookahead)
+    executor = ThreadPoolExecutor(max_workers=lookahead)
+    get_page_ids = bind_context(get_ozon_ids_on_page)
+    pending: Deque[Future] = deque()
+    try:
+        for page in islice(pages, lookahead):
+            pending.append(
+                executor.submit(get_page_ids, url + f'?page={page}'),
+            )
+        while pending:
+            added_ids = filter_new_ids(pending.popleft().result())
+            if on_page is not None:
+                on_page()
+            new_ids = extend_with_unique(new_ids, added_ids)
+            logger.info(
+                f'Количество новых элементов на странице: {len(new_ids)}',
+            )
+            if len(new_ids) >= products_count:
+                return new_ids[:products_count]
+            for page in islice(pages, 1):
+                pending.append(
+                    executor.submit(get_page_ids, url + f'?page={page}'),
+                )
+        return new_ids
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def get_stale_products(
+    products_count: int,
+    max_age: int = REFRESH_MAX_AGE_HOURS,
+) -> List[int]:
+    """Метод получения сохраненных продуктов, которые пора обновить.
+
+    Args:
+        products_count: необходимое количество продуктов.
+        max_age: возраст данных в часах, после которого они устарели.
+
+    Returns:
+        Список id продуктов, начиная с самых давно обновленных.
+    """
+    cutoff = datetime.now() - timedelta(hours=max_age)
+    return list(
+        Product.objects.filter(request_date__lt=cutoff)
+        .order_by('request_date')
+        .values_list('ozon_id', flat=True)[:products_count],
+    )
+
+
+def filter_stale_ids(
+    ozon_ids: List[int],
+    request_date: datetime,
+) -> List[int]:
+    """Отбор продуктов, еще не обновленных задачей от request_date.
+
+    Args:
+        ozon_ids: id продуктов задачи.
+        request_date: дата создания запроса.
+
+    Returns:
+        Необновленные id в исходном порядке.
+    """
+    stale_ids = set(
+        Product.objects.filter(
+            ozon_id__in=ozon_ids,
+            request_date__lt=request_date,
+        )
+        .order_by()
+        .values_list('ozon_id', flat=True),
+    )
+    return [ozon_id for ozon_id in ozon_ids if ozon_id in stale_ids]
+
+
+def count_saved_ids(ozon_ids: List[int], request_date: datetime) -> int:
+    """Количество продуктов, записанных задачей от request_date.
+
+    Учитываются записи всех попыток задачи, а не только последней.
+
+    Args:
+        ozon_ids: id продуктов задачи.
+        request_date: дата создания запроса.
+
+    Returns:
+        Количество продуктов с датой запроса не раньше request_date.
+    """
+    return (
+        Product.objects.filter(
+            ozon_id__in=ozon_ids,
+            request_date__gte=request_date,
+        )
+        .order_by()
+        .count()
+    )
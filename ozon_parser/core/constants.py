@@ -1,3 +1,5 @@
+from typing import Dict, Tuple
+
 OZON_SELLER_1_PRODUCTS = 'https://www.ozon.ru/seller/1/products/'
 OZON_PRODUCT_URL = 'https://www.ozon.ru/product/'
 SELLER_PAGE_MARK = 'div.wi4'
@@ -11,3 +13,140 @@ DATA_TAGS = {
     'discount': {'tag': 'div', 'class': 'i2 j2 p9k'},
     'description': {'tag': 'div', 'class': 'ra-a1'},
 }
+DRIVER_POOL_SIZE = 3
+DRIVER_POOL_TIMEOUT = 300
+DRIVER_MAX_PAGES = 100
+FETCH_CONCURRENCY = 3
+FETCH_HOST_INTERVAL = 1.5
+READINESS_MIN_TIMEOUT = 10
+READINESS_MAX_TIMEOUT = 100
+READINESS_POLL_FREQUENCY = 0.25
+NETWORK_IDLE_TIME = 0.5
+THROTTLE_MARKERS = ('Доступ ограничен', 'Antibot Challenge Page')
+THROTTLE_BACKOFF_BASE = 5
+THROTTLE_BACKOFF_MAX = 120
+THROTTLE_RETRIES = 3
+JSON_STATE_TAGS = {
+    'name': {'widget': 'webProductHeading', 'key': 'title'},
+    'image': {'widget': 'webGallery', 'key': 'coverImage'},
+    'price': {'widget': 'webPrice', 'key': 'price'},
+    'original_price': {'widget': 'webPrice', 'key': 'originalPrice'},
+    'description': {'widget': 'webDescription', 'key': 'richAnnotation'},
+}
+HTTP_TIMEOUT = 15
+HTTP_POOL_SIZE = 10
+HTTP_MIN_ATTEMPTS = 3
+HTTP_MIN_SUCCESS_RATE = 0.5
+HTTP_PROBE_INTERVAL = 20
+HTTP_HISTORY_SIZE = 100
+DEFAULT_PRODUCTS_COUNT = 10
+PAGINATION_LOOKAHEAD = 3
+MAX_PAGINATION_LOOKAHEAD = 10
+WRITE_BATCH_SIZE = 10
+PARSE_PLAN_TIMEOUT = 60 * 60 * 24
+REFRESH_MAX_AGE_HOURS = 24
+PARSE_CHUNK_SIZE = 5
+PARSE_CHUNK_RETRIES = 3
+PAGE_CACHE_TTL = {'seller': 60 * 10, 'product': 60 * 60, 'page': 60 * 10}
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+JOB_LOCK_TIMEOUT = 60 * 60
+PAGE_LOCK_TIMEOUT = 120
+PAGE_LOCK_POLL_INTERVAL = 0.5
+JOB_TIMEOUT = 60 * 60 * 24
+JOB_STREAM_INTERVAL = 1
+JOB_STREAM_TIMEOUT = 60 * 10
+PRODUCTS_ORDERING = ('name', 'price', 'id')
+PRODUCTS_PAGE_SIZE = 50
+MAX_PRODUCTS_PAGE_SIZE = 200
+PRODUCTS_CACHE_TIMEOUT = 60 * 10
+MAX_FILTER_OZON_IDS = 100
+MAX_SEARCH_LENGTH = 100
+STATS_BATCHES_LIMIT = 50
+CURRENCIES = {'₽': 'RUB', '$': 'USD', '€': 'EUR', '₸': 'KZT', 'Br': 'BYN'}
+DEFAULT_CURRENCY = 'RUB'
+EXPORT_FIELDS = (
+    'ozon_id',
+    'name',
+    'price',
+    'original_price',
+    'discount',
+    'discount_percent',
+    'currency',
+    'description',
+    'image_url',
+    'request_date',
+)
+EXPORT_CHUNK_SIZE = 2000
+NOTIFY_WINDOW = 10
+TELEGRAM_SEND_INTERVAL = 3
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_RETRIES = 3
+BOT_MESSAGE_TIMEOUT = 60 * 60
+METRIC_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    60,
+    120,
+)
+BENCHMARK_REPEAT = 3
+BENCHMARK_TOLERANCE = 0.2
+DRIVER_BLANK_URL = 'about:blank'
+DRIVER_MAX_RSS_MB = 1536
+MEMORY_BUCKETS = (
+    16,
+    32,
+    64,
+    128,
+    256,
+    384,
+    512,
+    768,
+    1024,
+    1536,
+    2048,
+    3072,
+    4096,
+)
+BLOCKED_RESOURCES = {
+    'images': (
+        '*.jpg*',
+        '*.jpeg*',
+        '*.png*',
+        '*.gif*',
+        '*.webp*',
+        '*.avif*',
+        '*.svg*',
+        '*.ico*',
+    ),
+    'media': ('*.mp4*', '*.webm*', '*.m3u8*', '*.ts?*', '*.mp3*'),
+    'fonts': ('*.woff*', '*.ttf*', '*.otf*', '*.eot*'),
+    'third_party_scripts': (
+        '*mc.yandex.ru*',
+        '*an.yandex.ru*',
+        '*yastatic.net*',
+        '*googletagmanager.com*',
+        '*google-analytics.com*',
+        '*doubleclick.net*',
+        '*top-fwz1.mail.ru*',
+        '*vk.com/js*',
+        '*criteo*',
+        '*adfox*',
+    ),
+}
+RESOURCE_ALLOWLIST: Dict[str, Tuple[str, ...]] = {
+    'seller': (),
+    'product': (),
+}
+RESOURCE_BLOCKING_SAMPLE = 50
@@ -0,0 +1,188 @@
+import json
+import re
+import threading
+from hashlib import sha1
+from pathlib import Path
+from time import sleep
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from selenium.common.exceptions import WebDriverException
+
+from core.backends import has_selector
+from core.constants import DRIVER_BLANK_URL
+from core.readiness import JSON_STATE_SCRIPT, NETWORK_IDLE_SCRIPT
+from ozon_parser.celery import logger
+
+INDEX_FILE = 'index.jsonl'
+TITLE_RE = re.compile(r'<title[^>]*>([^<]*)</title>')
+
+
+class PageCorpus:
+    """Каталог с сохраненными html страниц для воспроизведения.
+
+    Страницы хранятся в файлах, разложенных по типам страниц, а их
+    адреса перечислены в index.jsonl, по одной записи в строке. При
+    повторной записи адреса файл перезаписывается.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._pages: Optional[Dict[str, Tuple[str, str]]] = None
+
+    def record(self, url: str, page_type: str, html: str) -> None:
+        """Сохранение страницы в корпус.
+
+        Ошибки записи не прерывают парсинг.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+            html: html страницы.
+        """
+        name = f'{page_type}/{sha1(url.encode()).hexdigest()}.html'
+        entry = json.dumps({'url': url, 'page_type': page_type, 'file': name})
+        try:
+            with self._lock:
+                file = self.path / name
+                file.parent.mkdir(parents=True, exist_ok=True)
+                file.write_text(html, encoding='utf-8')
+                with open(self.path / INDEX_FILE, 'a', encoding='utf-8') as f:
+                    f.write(entry + '\n')
+                if self._pages is not None:
+                    self._pages[url] = (page_type, name)
+        except OSError as err:
+            logger.warning(f'Не удалось записать страницу {url}: {err}')
+
+    def load(self) -> Dict[str, Tuple[str, str]]:
+        """Чтение списка страниц корпуса.
+
+        Returns:
+            Словарь адрес -> тип страницы и путь к файлу.
+        """
+        with self._lock:
+            if self._pages is None:
+                self._pages = {}
+                index = self.path / INDEX_FILE
+                if index.exists():
+                    with open(index, encoding='utf-8') as f:
+                        for line in f:
+                            entry = json.loads(line)
+                            self._pages[entry['url']] = (
+                                entry['page_type'],
+                                entry['file'],
+                            )
+            return self._pages
+
+    def urls(self, page_type: str) -> List[str]:
+        """Адреса страниц заданного типа.
+
+        Args:
+            page_type: тип страницы.
+
+        Returns:
+            Адреса в порядке первой записи.
+        """
+        return [
+            url
+            for url, (url_type, _) in self.load().items()
+            if url_type == page_type
+        ]
+
+    def get(self, url: str) -> Optional[str]:
+        """Получение html страницы.
+
+        Args:
+            url: адрес страницы.
+
+        Returns:
+            html страницы или None, если ее нет в корпусе.
+        """
+        page = self.load().get(url)
+        if page is None:
+            return None
+        return (self.path / page[1]).read_text(encoding='utf-8')
+
+
+page_corpus = (
+    PageCorpus(settings.PAGE_CORPUS_DIR) if settings.PAGE_CORPUS_DIR else None
+)
+
+
+class ReplayDriver:
+    """Заменитель драйвера Chrome, отдающий страницы из корпуса.
+
+    Поддерживает только то, что нужно get_html и условиям готовности:
+    переход, page_source, title, find_elements и скрипты проверки
+    готовности. Команды CDP принимаются, но ни на что не влияют.
+    Задержка latency имитирует загрузку страницы.
+    """
+
+    def __init__(self, corpus: PageCorpus, latency: float = 0) -> None:
+        self.corpus = corpus
+        self.latency = latency
+        self.page_source = ''
+        self.title = ''
+
+    def get(self, url: str) -> None:
+        """Переход по адресу.
+
+        Args:
+            url: адрес страницы.
+
+        Raises:
+            WebDriverException: если страницы нет в корпусе.
+        """
+        if url == DRIVER_BLANK_URL:
+            self.page_source = self.title = ''
+            return
+        html = self.corpus.get(url)
+        if html is None:
+            raise WebDriverException(f'Страницы {url} нет в корпусе')
+        if self.latency:
+            sleep(self.latency)
+        self.page_source = html
+        match = TITLE_RE.search(html)
+        self.title = match.group(1) if match else ''
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        """Выполнение скриптов проверки готовности.
+
+        Args:
+            script: текст скрипта.
+            args: аргументы скрипта.
+
+        Returns:
+            Результат, который вернул бы браузер после полной загрузки.
+        """
+        if script == NETWORK_IDLE_SCRIPT:
+            return float('inf')
+        if script == JSON_STATE_SCRIPT:
+            return f'id="state-{args[0]}-' in self.page_source
+        if 'readyState' in script:
+            return 'complete'
+        return None
+
+    def execute_cdp_cmd(self, command: str, params: Dict[str, Any]) -> None:
+        """Команды CDP не выполняются.
+
+        Args:
+            command: имя команды.
+            params: параметры команды.
+        """
+
+    def find_elements(self, by: str, value: str) -> List[str]:
+        """Поиск элементов по css-селектору вида tag.class.
+
+        Args:
+            by: способ поиска.
+            value: селектор.
+
+        Returns:
+            Список из селектора, если элемент есть на странице.
+        """
+        return [value] if has_selector(self.page_source, value) else []
+
+    def quit(self) -> None:
+        """Закрытие драйвера."""
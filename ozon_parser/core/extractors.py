@@ -0,0 +1,391 @@
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from html import unescape
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+from core.constants import (
+    CURRENCIES,
+    DATA_TAGS,
+    DEFAULT_CURRENCY,
+    JSON_STATE_TAGS,
+)
+from ozon_parser.celery import logger
+
+STATE_ATTRIBUTE = 'data-state='
+TAG_RE = re.compile(r'<[^>]+>')
+DISCOUNT_RE = re.compile(r'\d+')
+PLAN_FIELDS = {
+    'name': 'name',
+    'image_url': 'image',
+    'price': 'price',
+    'discount': 'discount',
+    'description': 'description',
+}
+PLAN_CHILDREN = {
+    'image': ('img', 'src'),
+    'discount': ('span',),
+}
+
+
+def find_widget_state(html: str, widget: str) -> Optional[Dict[str, Any]]:
+    """Декодирование состояния одного виджета страницы Ozon.
+
+    Ozon кладет состояние виджета в атрибут data-state элемента с id
+    state-<widget>-<номер>. Декодируется только этот атрибут, а не весь
+    документ.
+
+    Args:
+        html: html страницы.
+        widget: имя виджета.
+
+    Returns:
+        Состояние виджета или None, если оно не найдено.
+    """
+    start = html.find(f'id="state-{widget}-')
+    if start == -1:
+        return None
+    attribute = html.find(STATE_ATTRIBUTE, start)
+    if attribute == -1 or '>' in html[start:attribute]:
+        return None
+    value_start = attribute + len(STATE_ATTRIBUTE) + 1
+    if value_start > len(html):
+        return None
+    quote = html[value_start - 1]
+    if quote not in ('"', "'"):
+        return None
+    end = html.find(quote, value_start)
+    if end == -1:
+        return None
+    try:
+        state = json.loads(unescape(html[value_start:end]))
+    except ValueError as err:
+        logger.info(f'Не удалось декодировать состояние {widget}: {err}')
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def parse_price(price: Any) -> Optional[str]:
+    """Приведение цены вида '1 599 ₽' к строке из цифр.
+
+    Args:
+        price: цена из состояния страницы.
+
+    Returns:
+        Цена без пробелов и валюты или None.
+    """
+    if not isinstance(price, str) or not price.split():
+        return None
+    return ''.join(price.split()[:-1]) or None
+
+
+def get_currency(price: Any) -> Optional[str]:
+    """Определение валюты по цене вида '1 599 ₽'.
+
+    Args:
+        price: цена из состояния или разметки страницы.
+
+    Returns:
+        Код валюты ISO 4217 или None, если валюта не распознана.
+    """
+    if not isinstance(price, str) or not price.split():
+        return None
+    return CURRENCIES.get(price.split()[-1])
+
+
+def parse_discount_percent(discount: Optional[str]) -> Optional[int]:
+    """Приведение скидки вида '−15%' к числу процентов.
+
+    Args:
+        discount: скидка со страницы.
+
+    Returns:
+        Скидка в процентах или None, если скидки нет.
+    """
+    if not discount:
+        return None
+    match = DISCOUNT_RE.search(discount)
+    return int(match.group()) if match else None
+
+
+def normalize_fields(fields: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Дополнение полей продукта числовой скидкой и валютой.
+
+    Args:
+        fields: поля продукта со страницы.
+
+    Returns:
+        Поля продукта в формате ProductWriteSerializer.
+    """
+    return {
+        **fields,
+        'discount_percent': parse_discount_percent(fields.get('discount')),
+        'currency': fields.get('currency') or DEFAULT_CURRENCY,
+    }
+
+
+def get_discount_from_prices(
+    price: Optional[str],
+    original_price: Optional[str],
+) -> Optional[str]:
+    """Вычисление скидки в формате Ozon по цене и цене без скидки.
+
+    Args:
+        price: цена со скидкой.
+        original_price: цена без скидки.
+
+    Returns:
+        Скидку вида '−15%' или None, если скидки нет.
+    """
+    if not (price and original_price):
+        return None
+    if not (price.isdigit() and original_price.isdigit()):
+        return None
+    if int(original_price) <= int(price):
+        return None
+    percent = round((1 - int(price) / int(original_price)) * 100)
+    return f'−{percent}%'
+
+
+def get_state_fields(html: str) -> Dict[str, Optional[str]]:
+    """Получение полей продукта из встроенного состояния страницы.
+
+    Args:
+        html: html страницы продукта.
+
+    Returns:
+        Словарь полей, которые удалось определить по состоянию.
+        Поля, для которых состояние не найдено, в словарь не входят.
+    """
+    states: Dict[str, Optional[Dict[str, Any]]] = {}
+    values: Dict[str, Any] = {}
+    for field, tag in JSON_STATE_TAGS.items():
+        if tag['widget'] not in states:
+            states[tag['widget']] = find_widget_state(html, tag['widget'])
+        state = states[tag['widget']]
+        if state is not None:
+            values[field] = state.get(tag['key'])
+    fields: Dict[str, Optional[str]] = {}
+    if isinstance(values.get('name'), str):
+        fields['name'] = values['name'].strip()
+    if isinstance(values.get('image'), str):
+        fields['image_url'] = values['image']
+    if 'price' in values:
+        price = parse_price(values['price'])
+        if price is not None:
+            original_price = parse_price(values.get('original_price'))
+            fields['price'] = price
+            fields['original_price'] = original_price
+            currency = get_currency(values['price'])
+            if currency is not None:
+                fields['currency'] = currency
+            fields['discount'] = get_discount_from_prices(
+                price,
+                original_price,
+            )
+    if isinstance(values.get('description'), str):
+        fields['description'] = unicodedata.normalize(
+            'NFKD',
+            ' '.join(TAG_RE.sub(' ', values['description']).split()),
+        )
+    return fields
+
+
+class StopParsing(Exception):
+    """Сигнал прекращения разбора, когда все поля уже найдены."""
+
+
+class FieldRule:
+    """Правило поиска поля: контейнер и, при необходимости, потомок."""
+
+    def __init__(
+        self,
+        tag: str,
+        css_class: str,
+        child_tag: Optional[str] = None,
+        child_attribute: Optional[str] = None,
+    ) -> None:
+        self.tag = tag
+        self.css_class = css_class
+        self.child_tag = child_tag
+        self.child_attribute = child_attribute
+
+    def matches(self, tag: str, attributes: Any) -> bool:
+        """Проверка, что элемент является контейнером поля.
+
+        Класс сравнивается так же, как в BeautifulSoup: совпадает либо
+        весь атрибут class, либо один из его классов.
+
+        Args:
+            tag: имя тега.
+            attributes: атрибуты элемента.
+
+        Returns:
+            True, если элемент подходит под правило.
+        """
+        if tag != self.tag:
+            return False
+        classes = attributes.get('class') or ''
+        return classes == self.css_class or self.css_class in classes.split()
+
+
+class FieldState:
+    """Состояние поиска одного поля во время разбора."""
+
+    def __init__(self, rule: FieldRule, depth: int) -> None:
+        self.rule = rule
+        self.depth = depth
+        self.child_depth: Optional[int] = None
+        self.text: List[str] = []
+
+    @property
+    def collecting(self) -> bool:
+        """Нужно ли сейчас собирать текст.
+
+        Returns:
+            True, если текст элемента входит в значение поля.
+        """
+        return self.rule.child_tag is None or self.child_depth is not None
+
+
+class PlanTarget:
+    """Получатель событий парсера lxml, собирающий поля за один проход."""
+
+    def __init__(self, rules: Dict[str, FieldRule]) -> None:
+        self.rules = rules
+        self.depth = 0
+        self.active: Dict[str, FieldState] = {}
+        self.results: Dict[str, Optional[str]] = {}
+
+    def _finish(self, field: str, value: Optional[str]) -> None:
+        del self.active[field]
+        self.results[field] = value
+        if len(self.results) == len(self.rules):
+            raise StopParsing
+
+    def start(self, tag: str, attributes: Any) -> None:
+        """Обработка открывающего тега.
+
+        Args:
+            tag: имя тега.
+            attributes: атрибуты элемента.
+        """
+        self.depth += 1
+        for field, state in list(self.active.items()):
+            rule = state.rule
+            if state.child_depth is not None or tag != rule.child_tag:
+                continue
+            if rule.child_attribute is not None:
+                self._finish(field, attributes.get(rule.child_attribute))
+            else:
+                state.child_depth = self.depth
+        for field, rule in self.rules.items():
+            if field in self.results or field in self.active:
+                continue
+            if rule.matches(tag, attributes):
+                self.active[field] = FieldState(rule, self.depth)
+
+    def data(self, text: str) -> None:
+        """Обработка текста.
+
+        Args:
+            text: фрагмент текста.
+        """
+        for state in self.active.values():
+            if state.collecting:
+                state.text.append(text)
+
+    def end(self, tag: str) -> None:
+        """Обработка закрывающего тега.
+
+        Args:
+            tag: имя тега.
+        """
+        for field, state in list(self.active.items()):
+            if state.child_depth == self.depth:
+                self._finish(field, ''.join(state.text))
+            elif state.depth == self.depth:
+                self._finish(
+                    field,
+                    None if state.rule.child_tag else ''.join(state.text),
+                )
+        self.depth -= 1
+
+    def close(self) -> Dict[str, Optional[str]]:
+        """Завершение разбора.
+
+        Returns:
+            Найденные значения полей.
+        """
+        return self.results
+
+
+class ExtractionPlan:
+    """Набор правил DATA_TAGS, применяемых за один проход по html.
+
+    Дерево документа не строится: парсер lxml передает события
+    напрямую в PlanTarget, а разбор прекращается после последнего поля.
+    """
+
+    def __init__(self, rules: Dict[str, FieldRule]) -> None:
+        self.rules = rules
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        """Извлечение сырых значений полей из html.
+
+        Args:
+            html: html страницы.
+
+        Returns:
+            Значения полей; None для ненайденных.
+        """
+        target = PlanTarget(self.rules)
+        parser = etree.HTMLParser(target=target)
+        try:
+            parser.feed(html)
+            parser.close()
+        except StopParsing:
+            pass
+        return {field: target.results.get(field) for field in self.rules}
+
+
+@lru_cache(maxsize=None)
+def get_product_plan() -> ExtractionPlan:
+    """Компиляция DATA_TAGS в план извлечения полей продукта.
+
+    Returns:
+        План, общий для всех страниц процесса.
+    """
+    return ExtractionPlan(
+        {
+            field: FieldRule(
+                DATA_TAGS[tag]['tag'],
+                DATA_TAGS[tag]['class'],
+                *PLAN_CHILDREN.get(tag, ()),
+            )
+            for field, tag in PLAN_FIELDS.items()
+        },
+    )
+
+
+def get_dom_fields(html: str) -> Dict[str, Optional[str]]:
+    """Получение полей продукта из разметки страницы за один проход.
+
+    Args:
+        html: html страницы продукта.
+
+    Returns:
+        Поля продукта в формате ProductWriteSerializer.
+    """
+    fields = get_product_plan().extract(html)
+    price = fields['price']
+    if price is not None:
+        fields['price'] = ''.join(price.split()[:-1])
+        fields['currency'] = get_currency(price)
+    description = fields['description']
+    if description is not None:
+        fields['description'] = unicodedata.normalize('NFKD', description)
+    return fields
@@ -0,0 +1,164 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from time import monotonic, sleep
+from typing import Deque, Dict, Iterator, List
+from urllib.parse import urlsplit
+
+from core.backends import (
+    backend_history,
+    browser_backend,
+    has_selector,
+    http_backend,
+)
+from core.constants import FETCH_CONCURRENCY, FETCH_HOST_INTERVAL
+from core.corpus import page_corpus
+from core.metrics import bind_context, metrics
+from core.page_cache import page_cache
+from core.readiness import get_readiness, is_throttled
+from ozon_parser.celery import logger
+
+
+class HostRateLimiter:
+    """Ограничитель частоты запросов к одному хосту.
+
+    Между началами двух загрузок с одного хоста проходит не меньше
+    interval секунд, сколько бы потоков ни загружали страницы.
+    """
+
+    def __init__(self, interval: float = FETCH_HOST_INTERVAL) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        """Ожидание очереди на загрузку страницы.
+
+        Args:
+            url: адрес загружаемой страницы.
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.interval
+        if start > now:
+            sleep(start - now)
+
+
+host_rate_limiter = HostRateLimiter()
+
+
+def load_page(url: str, css_selector: str, page_type: str) -> str:
+    """Загрузка страницы без браузера или через браузер из пула.
+
+    Args:
+        url: адрес страницы.
+        css_selector: селектор, появление которого ожидается.
+        page_type: тип страницы.
+
+    Returns:
+        html страницы.
+    """
+    with metrics.span('fetch.rate_limit'):
+        host_rate_limiter.wait(url)
+    html = None
+    if backend_history.should_try_http(url):
+        with metrics.span('fetch.http'):
+            html = http_backend.fetch(url, css_selector)
+        backend_history.record(url, html is not None)
+        if html is not None:
+            logger.info(f'Страница {url} загружена без браузера')
+    if html is None:
+        with metrics.span('fetch.browser'):
+            html = browser_backend.fetch(url, css_selector)
+    if has_selector(html, css_selector) and not is_throttled(html):
+        page_cache.set(url, page_type, html)
+        if page_corpus is not None:
+            page_corpus.record(url, page_type, html)
+    return html
+
+
+def fetch_page(
+    url: str,
+    css_selector: str = '',
+    use_cache: bool = True,
+) -> str:
+    """Загрузка страницы самым дешевым подходящим способом.
+
+    Сначала страница ищется в кэше, затем запрашивается без браузера,
+    если для похожих адресов это раньше удавалось. Браузер из пула
+    используется, когда странице нужен JS или Ozon отдал страницу
+    проверки. Полностью загруженные страницы сохраняются в кэш.
+
+    Если ту же страницу уже загружает другая задача, результат берется
+    из кэша после окончания ее загрузки, а не запрашивается повторно.
+
+    Args:
+        url: адрес страницы.
+        css_selector: селектор, появление которого ожидается.
+        use_cache: можно ли взять страницу из кэша.
+
+    Returns:
+        html страницы.
+    """
+    page_type = get_readiness(css_selector).page_type
+    if not use_cache:
+        return load_page(url, css_selector, page_type)
+    with metrics.span('fetch.cache'):
+        html = page_cache.get(url, page_type)
+    if html is not None:
+        return html
+    lock = page_cache.lock(url)
+    if lock is None:
+        with metrics.span('fetch.wait_other'):
+            html = page_cache.wait(url, page_type)
+        if html is not None:
+            logger.info(f'Страница {url} получена от другой задачи')
+            return html
+    try:
+        return load_page(url, css_selector, page_type)
+    finally:
+        page_cache.release(lock)
+
+
+def fetch_pages(
+    urls: List[str],
+    css_selector: str = '',
+    concurrency: int = FETCH_CONCURRENCY,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """Параллельная загрузка нескольких страниц.
+
+    Одновременно загружается не больше concurrency страниц, а следующая
+    загрузка начинается, когда отдается самая ранняя из них. Поэтому,
+    как бы медленно ни обрабатывались страницы, кроме отданной в памяти
+    остается не больше concurrency страниц.
+
+    Args:
+        urls: адреса страниц.
+        css_selector: селектор, появление которого ожидается.
+        concurrency: максимальное количество одновременных загрузок.
+        use_cache: можно ли брать страницы из кэша.
+
+    Yields:
+        html страниц в порядке следования адресов.
+    """
+    workers = max(1, min(concurrency, len(urls)))
+    load = bind_context(lambda url: fetch_page(url, css_selector, use_cache))
+    remaining = iter(urls)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque(
+            executor.submit(load, url) for url in islice(remaining, workers)
+        )
+        try:
+            while pending:
+                future = pending.popleft()
+                for url in islice(remaining, 1):
+                    pending.append(executor.submit(load, url))
+                yield future.result()
+                del future
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,269 @@
+from hashlib import sha1
+from time import monotonic, sleep, time
+from typing import Any, Dict, Iterator, Optional
+
+from django.core.cache import cache
+
+from core.constants import (
+    JOB_LOCK_TIMEOUT,
+    JOB_STREAM_INTERVAL,
+    JOB_STREAM_TIMEOUT,
+    JOB_TIMEOUT,
+)
+
+JOB_COUNTERS = ('pages', 'fetched', 'saved', 'failed')
+JOB_STATUSES = ('queued', 'planning', 'fetching', 'finished', 'failed')
+JOB_FINAL_STATUSES = ('finished', 'failed')
+JOB_FIELDS = ('status', 'total', 'started_at', 'finished_at')
+
+
+def get_job_key(url: str, refresh: bool = False) -> str:
+    """Ключ кэша с id задачи, которая сейчас парсит продавца.
+
+    Args:
+        url: адрес страницы продавца.
+        refresh: обновляет ли задача уже сохраненные товары.
+
+    Returns:
+        Ключ кэша.
+    """
+    mode = 'refresh' if refresh else 'new'
+    return f'parse_job:{mode}:{sha1(url.encode()).hexdigest()}'
+
+
+def acquire_job(url: str, refresh: bool, job_id: str) -> str:
+    """Регистрация задачи, если продавца еще никто не парсит.
+
+    Ключ добавляется атомарно, поэтому из одновременных запросов
+    регистрируется только один.
+
+    Args:
+        url: адрес страницы продавца.
+        refresh: обновляет ли задача уже сохраненные товары.
+        job_id: id новой задачи.
+
+    Returns:
+        job_id, если задача зарегистрирована, иначе id уже запущенной.
+    """
+    key = get_job_key(url, refresh)
+    while not cache.add(key, job_id, JOB_LOCK_TIMEOUT):
+        running: Optional[str] = cache.get(key)
+        if running is not None:
+            return running
+    return job_id
+
+
+def release_job(url: str, refresh: bool, job_id: str) -> None:
+    """Снятие регистрации завершенной задачи.
+
+    Args:
+        url: адрес страницы продавца.
+        refresh: обновляет ли задача уже сохраненные товары.
+        job_id: id завершенной задачи.
+    """
+    key = get_job_key(url, refresh)
+    if cache.get(key) == job_id:
+        cache.delete(key)
+
+
+def get_job_info_key(job_id: str) -> str:
+    """Ключ кэша с неизменяемой частью описания задачи.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+
+    Returns:
+        Ключ кэша.
+    """
+    return f'parse_job:{job_id}'
+
+
+def get_job_counter_key(job_id: str, counter: str) -> str:
+    """Ключ кэша со счетчиком прогресса задачи.
+
+    Счетчики хранятся отдельно от описания, чтобы подзадачи на разных
+    воркерах увеличивали их атомарно.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        counter: имя счетчика из JOB_COUNTERS.
+
+    Returns:
+        Ключ кэша.
+    """
+    return f'parse_job:{job_id}:{counter}'
+
+
+def get_job_field_key(job_id: str, field: str) -> str:
+    """Ключ кэша с изменяемым полем описания задачи.
+
+    Каждое поле хранится отдельно, чтобы одновременные изменения разных
+    полей не затирали друг друга.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        field: имя поля из JOB_FIELDS.
+
+    Returns:
+        Ключ кэша.
+    """
+    return f'parse_job:{job_id}:field:{field}'
+
+
+def create_job(job_id: str, url: str, refresh: bool = False) -> None:
+    """Создание описания задачи в очереди.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        url: адрес страницы продавца.
+        refresh: обновляет ли задача уже сохраненные товары.
+    """
+    cache.set_many(
+        {get_job_counter_key(job_id, counter): 0 for counter in JOB_COUNTERS},
+        JOB_TIMEOUT,
+    )
+    cache.set_many(
+        {
+            get_job_field_key(job_id, 'status'): 'queued',
+            get_job_field_key(job_id, 'total'): None,
+            get_job_field_key(job_id, 'started_at'): None,
+            get_job_field_key(job_id, 'finished_at'): None,
+        },
+        JOB_TIMEOUT,
+    )
+    cache.set(
+        get_job_info_key(job_id),
+        {'url': url, 'refresh': refresh, 'created_at': time()},
+        JOB_TIMEOUT,
+    )
+
+
+def update_job(job_id: Optional[str], **fields: Any) -> None:
+    """Изменение описания задачи.
+
+    Записываются только переданные поля, каждое в свой ключ, поэтому
+    одновременные изменения задачей parse_ozon_seller и завершающей ее
+    finish_parsing или fail_parsing не теряются.
+    Задачи, запущенные не через start_parsing, не отслеживаются.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        fields: новые значения полей из JOB_FIELDS.
+    """
+    if job_id is None or cache.get(get_job_info_key(job_id)) is None:
+        return
+    cache.set_many(
+        {
+            get_job_field_key(job_id, field): value
+            for field, value in fields.items()
+        },
+        JOB_TIMEOUT,
+    )
+
+
+def increment_job(job_id: Optional[str], counter: str, delta: int = 1) -> None:
+    """Увеличение счетчика прогресса задачи.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        counter: имя счетчика из JOB_COUNTERS.
+        delta: величина увеличения.
+    """
+    if job_id is None or not delta:
+        return
+    key = get_job_counter_key(job_id, counter)
+    cache.add(key, 0, JOB_TIMEOUT)
+    cache.incr(key, delta)
+
+
+def finish_job(job_id: str, saved: int, failed: int) -> None:
+    """Отметка о завершении задачи с точными итогами.
+
+    Счетчик failed, увеличенный подзадачами по ходу работы, может
+    учитывать повторы, а saved - пропускать попытки, потерянные вместе
+    с воркером, поэтому по завершении они заменяются итогами. Итог saved
+    подзадачи считают по базе, и он не меньше записанного на самом деле.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        saved: количество сохраненных товаров.
+        failed: количество несохраненных товаров.
+    """
+    cache.set_many(
+        {
+            get_job_counter_key(job_id, 'saved'): saved,
+            get_job_counter_key(job_id, 'failed'): failed,
+        },
+        JOB_TIMEOUT,
+    )
+    update_job(job_id, status='finished', finished_at=time())
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Получение состояния задачи.
+
+    Оставшееся время оценивается по средней скорости обработки уже
+    загруженных товаров.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+
+    Returns:
+        Описание, счетчики и оценка оставшегося времени в секундах или
+        None, если задача не найдена.
+    """
+    info = cache.get(get_job_info_key(job_id))
+    if info is None:
+        return None
+    fields = cache.get_many(
+        [get_job_field_key(job_id, field) for field in JOB_FIELDS],
+    )
+    counters = cache.get_many(
+        [get_job_counter_key(job_id, counter) for counter in JOB_COUNTERS],
+    )
+    job = {'id': job_id, **info}
+    for field in JOB_FIELDS:
+        job[field] = fields.get(get_job_field_key(job_id, field))
+    for counter in JOB_COUNTERS:
+        job[counter] = counters.get(get_job_counter_key(job_id, counter), 0)
+    done = job['saved'] + job['failed']
+    job['eta'] = None
+    if job['status'] == 'fetching' and job['total'] and done:
+        elapsed = time() - job['started_at']
+        job['eta'] = round(elapsed / done * max(0, job['total'] - done))
+    return job
+
+
+def watch_job(
+    job_id: str,
+    interval: float = JOB_STREAM_INTERVAL,
+    timeout: float = JOB_STREAM_TIMEOUT,
+) -> Iterator[Dict[str, Any]]:
+    """Отслеживание изменений состояния задачи.
+
+    Состояние проверяется раз в interval секунд, а отдается только
+    после изменения. Наблюдение прекращается после завершения задачи,
+    в том числе с ошибкой, ее исчезновения из кэша или через timeout
+    секунд.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        interval: период проверки состояния в секундах.
+        timeout: максимальная длительность наблюдения в секундах.
+
+    Yields:
+        Состояние задачи, как в get_job.
+    """
+    deadline = monotonic() + timeout
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            return
+        state = {**job, 'eta': None}
+        if state != last:
+            last = state
+            yield job
+        if job['status'] in JOB_FINAL_STATUSES or monotonic() >= deadline:
+            return
+        sleep(interval)
@@ -0,0 +1,112 @@
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from core.extractors import get_dom_fields
+from core.utils import (
+    get_description,
+    get_discount,
+    get_image_url,
+    get_name,
+    get_price,
+)
+
+
+def extract_with_soup(html: str) -> Dict[str, Optional[str]]:
+    """Извлечение полей прежним способом: BeautifulSoup и get_*.
+
+    Args:
+        html: html страницы продукта.
+
+    Returns:
+        Поля продукта.
+    """
+    product_soup = BeautifulSoup(html, 'lxml')
+    return {
+        'name': get_name(product_soup),
+        'image_url': get_image_url(product_soup),
+        'price': get_price(product_soup),
+        'discount': get_discount(product_soup),
+        'description': get_description(product_soup),
+    }
+
+
+def measure(
+    extractor: Callable[[str], Dict[str, Optional[str]]],
+    pages: List[str],
+    repeat: int,
+) -> Tuple[float, int]:
+    """Замер времени и памяти извлечения полей.
+
+    Args:
+        extractor: функция извлечения полей.
+        pages: html страниц.
+        repeat: количество повторов.
+
+    Returns:
+        Среднее время на страницу в мс и пик выделенной памяти в байтах.
+    """
+    started = perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extractor(html)
+    elapsed = (perf_counter() - started) * 1000 / (repeat * len(pages))
+    tracemalloc.start()
+    for html in pages:
+        extractor(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+class Command(BaseCommand):
+    """Сравнение скорости извлечения полей на сохраненных страницах."""
+
+    help = 'Сравнивает get_* и план DATA_TAGS на html-файлах'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Описание аргументов команды.
+
+        Args:
+            parser: парсер аргументов.
+        """
+        parser.add_argument('path', help='Каталог с html страниц товаров')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Запуск сравнения.
+
+        Args:
+            args: позиционные аргументы.
+            options: аргументы команды.
+        """
+        pages = [
+            page.read_text(encoding='utf-8')
+            for page in sorted(Path(options['path']).glob('*.html'))
+        ]
+        if not pages:
+            raise CommandError(f'В {options["path"]} нет html-файлов')
+        for page in pages:
+            fields = get_dom_fields(page)
+            if any(
+                fields.get(field) != value
+                for field, value in extract_with_soup(page).items()
+            ):
+                self.stderr.write('Результаты извлечения различаются')
+        for name, extractor in (
+            ('BeautifulSoup + get_*', extract_with_soup),
+            ('План DATA_TAGS', get_dom_fields),
+        ):
+            elapsed, peak = measure(extractor, pages, options['repeat'])
+            self.stdout.write(
+                f'{name}: {elapsed:.2f} мс на страницу, '
+                f'пик памяти {peak / 1024:.0f} КБ',
+            )
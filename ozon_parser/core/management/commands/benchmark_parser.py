@@ -0,0 +1,422 @@
+import json
+import tracemalloc
+from contextlib import contextmanager
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.utils import timezone
+
+from core import fetch
+from core.backends import BrowserBackend
+from core.catalog import count_pages, get_new_products, parse_catalog_ids
+from core.constants import (
+    BENCHMARK_REPEAT,
+    BENCHMARK_TOLERANCE,
+    OZON_PRODUCT_URL,
+    PAGINATION_LOOKAHEAD,
+)
+from core.corpus import PageCorpus, ReplayDriver
+from core.memory import MB
+from core.pool import DriverPool
+from core.utils import get_product
+
+STAGES = ('count_pages', 'get_ozon_ids', 'get_new_products', 'get_product')
+HIGHER_IS_WORSE = ('p50_ms', 'p95_ms', 'peak_mb')
+
+
+class NullPageCache:
+    """Кэш страниц, в котором ничего не хранится."""
+
+    def get(self, url: str, page_type: str) -> None:
+        """Страницы в кэше нет.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+        """
+
+    def set(self, url: str, page_type: str, html: str) -> None:
+        """Страница не сохраняется.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+            html: html страницы.
+        """
+
+    def lock(self, url: str) -> None:
+        """Блокировка не берется.
+
+        Args:
+            url: адрес страницы.
+        """
+
+    def wait(self, url: str, page_type: str) -> None:
+        """Ждать другую задачу не нужно.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+        """
+
+    @staticmethod
+    def release(lock: Any) -> None:
+        """Снимать нечего.
+
+        Args:
+            lock: блокировка.
+        """
+
+
+class BrowserOnlyHistory:
+    """Статистика загрузок, всегда выбирающая браузер."""
+
+    def should_try_http(self, url: str) -> bool:
+        """Загрузка без браузера не пробуется.
+
+        Args:
+            url: адрес страницы.
+
+        Returns:
+            False.
+        """
+        return False
+
+    def record(self, url: str, success: bool) -> None:
+        """Результаты не учитываются.
+
+        Args:
+            url: адрес страницы.
+            success: удалось ли обойтись без браузера.
+        """
+
+
+@contextmanager
+def replay_pages(corpus: PageCorpus, latency: float) -> Iterator[None]:
+    """Загрузка страниц из корпуса вместо Ozon на время блока with.
+
+    Страницы отдаются драйверами ReplayDriver через обычный пул и
+    get_html, а кэш страниц, HTTP-загрузка и ограничение частоты
+    запросов отключаются.
+
+    Args:
+        corpus: корпус страниц.
+        latency: имитируемое время загрузки страницы в секундах.
+
+    Yields:
+        None.
+    """
+    pool = DriverPool(factory=lambda: ReplayDriver(corpus, latency))
+    replacements = {
+        'page_cache': NullPageCache(),
+        'backend_history': BrowserOnlyHistory(),
+        'browser_backend': BrowserBackend(pool),
+        'host_rate_limiter': fetch.HostRateLimiter(0),
+    }
+    originals = {name: getattr(fetch, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(fetch, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(fetch, name, value)
+        pool.close()
+
+
+def percentile(values: Sequence[float], quantile: float) -> float:
+    """Перцентиль по ближайшему рангу.
+
+    Args:
+        values: значения.
+        quantile: квантиль от 0 до 1.
+
+    Returns:
+        Значение перцентиля.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, ceil(quantile * len(ordered)) - 1)]
+
+
+def get_peak_memory(call: Callable[[Any], Any], items: List[Any]) -> float:
+    """Пиковый объем памяти, выделенной за один проход по аргументам.
+
+    Память считается через tracemalloc, поэтому учитываются только
+    объекты Python, созданные самими вызовами, а не память, занятая
+    процессом до них или предыдущими этапами.
+
+    Args:
+        call: замеряемая функция.
+        items: аргументы вызовов.
+
+    Returns:
+        Пиковый объем в МБ.
+    """
+    tracemalloc.start()
+    try:
+        for item in items:
+            call(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / MB
+
+
+def measure(
+    call: Callable[[Any], Any],
+    items: List[Any],
+    repeat: int,
+) -> Dict[str, float]:
+    """Замер скорости вызовов функции и памяти, которую они занимают.
+
+    Память замеряется отдельным проходом, чтобы tracemalloc не влиял на
+    время вызовов.
+
+    Args:
+        call: замеряемая функция.
+        items: аргументы вызовов.
+        repeat: количество повторов.
+
+    Returns:
+        Количество вызовов, вызовов в секунду, p50 и p95 в мс и пиковую
+        память одного прохода в МБ.
+    """
+    latencies = []
+    started = perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            call_started = perf_counter()
+            call(item)
+            latencies.append(perf_counter() - call_started)
+    elapsed = perf_counter() - started
+    return {
+        'calls': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'peak_mb': get_peak_memory(call, items),
+    }
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Сравнение результатов с сохраненными ранее.
+
+    Args:
+        results: результаты по этапам.
+        baseline: прежние результаты по этапам.
+        tolerance: допустимое относительное ухудшение.
+
+    Returns:
+        Описания ухудшений сверх допустимого.
+    """
+    regressions = []
+    for stage, result in results.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        for name in ('throughput', *HIGHER_IS_WORSE):
+            old, new = previous.get(name), result[name]
+            if not old:
+                continue
+            if name in HIGHER_IS_WORSE:
+                worse = new > old * (1 + tolerance)
+            else:
+                worse = new < old * (1 - tolerance)
+            if worse:
+                regressions.append(f'{stage}.{name}: {old:.2f} -> {new:.2f}')
+    return regressions
+
+
+class Command(BaseCommand):
+    """Замер скорости парсинга на записанных страницах без обращения к Ozon.
+
+    Корпус страниц записывается воркером, если задан PAGE_CORPUS_DIR.
+    """
+
+    help = (
+        'Замеряет count_pages, get_ozon_ids, get_new_products и '
+        'get_product на страницах из корпуса'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Описание аргументов команды.
+
+        Args:
+            parser: парсер аргументов.
+        """
+        parser.add_argument('path', help='Каталог корпуса страниц')
+        parser.add_argument(
+            '--stage',
+            action='append',
+            choices=STAGES,
+            help='Замеряемый этап, по умолчанию все',
+        )
+        parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Имитируемое время загрузки страницы в секундах',
+        )
+        parser.add_argument(
+            '--products-count',
+            type=int,
+            help='Сколько новых товаров искать, по умолчанию все',
+        )
+        parser.add_argument(
+            '--lookahead',
+            type=int,
+            default=PAGINATION_LOOKAHEAD,
+        )
+        parser.add_argument('--save', help='Файл для сохранения результатов')
+        parser.add_argument(
+            '--baseline',
+            help='Файл с прежними результатами для сравнения',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=BENCHMARK_TOLERANCE,
+            help='Допустимое относительное ухудшение',
+        )
+
+    def get_recorded_pages(self, corpus: PageCorpus, url: str) -> int:
+        """Количество подряд записанных страниц каталога продавца.
+
+        Args:
+            corpus: корпус страниц.
+            url: адрес главной страницы продавца.
+
+        Returns:
+            Номер последней страницы, до которой записаны все.
+        """
+        pages = set(corpus.urls('seller'))
+        count = 1
+        while f'{url}?page={count + 1}' in pages:
+            count += 1
+        return count
+
+    def find_new_products(
+        self,
+        corpus: PageCorpus,
+        url: str,
+        products_count: Optional[int],
+        lookahead: int,
+    ) -> List[int]:
+        """Поиск новых товаров продавца, как в plan_products.
+
+        Args:
+            corpus: корпус страниц.
+            url: адрес главной страницы продавца.
+            products_count: сколько новых товаров искать.
+            lookahead: количество страниц, загружаемых наперед.
+
+        Returns:
+            Список новых товаров.
+        """
+        pages_count, html = count_pages(url)
+        pages_count = min(pages_count, self.get_recorded_pages(corpus, url))
+        return get_new_products(
+            url,
+            html,
+            pages_count,
+            products_count or pages_count * 10**3,
+            lookahead,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Запуск замеров.
+
+        Args:
+            args: позиционные аргументы.
+            options: аргументы команды.
+
+        Raises:
+            CommandError: если корпус пуст или результаты хуже прежних.
+        """
+        corpus = PageCorpus(options['path'])
+        seller_urls = corpus.urls('seller')
+        product_urls = corpus.urls('product')
+        if not seller_urls and not product_urls:
+            raise CommandError(f'В {options["path"]} нет записанных страниц')
+        request_date = timezone.now()
+        seller_pages = [corpus.get(url) for url in seller_urls]
+        product_pages = [
+            (corpus.get(url), int(url.rstrip('/').rsplit('/', 1)[-1]))
+            for url in product_urls
+            if url.startswith(OZON_PRODUCT_URL)
+        ]
+        stages: Dict[str, Tuple[Callable[[Any], Any], List[Any]]] = {
+            'count_pages': (count_pages, seller_urls),
+            'get_ozon_ids': (parse_catalog_ids, seller_pages),
+            'get_new_products': (
+                lambda url: self.find_new_products(
+                    corpus,
+                    url,
+                    options['products_count'],
+                    options['lookahead'],
+                ),
+                [url for url in seller_urls if '?' not in url],
+            ),
+            'get_product': (
+                lambda page: get_product(
+                    page[0],
+                    page[1],
+                    request_date,
+                ).is_valid(),
+                product_pages,
+            ),
+        }
+        results = {}
+        with replay_pages(corpus, options['latency']):
+            for stage in options['stage'] or STAGES:
+                call, items = stages[stage]
+                if not items:
+                    self.stdout.write(f'{stage}: нет страниц')
+                    continue
+                result = results[stage] = measure(
+                    call,
+                    items,
+                    options['repeat'],
+                )
+                self.stdout.write(
+                    f'{stage}: {result["calls"]} вызовов, '
+                    f'{result["throughput"]:.1f} в секунду, '
+                    f'p50 {result["p50_ms"]:.2f} мс, '
+                    f'p95 {result["p95_ms"]:.2f} мс, '
+                    f'пик памяти {result["peak_mb"]:.1f} МБ',
+                )
+        if options['save']:
+            Path(options['save']).write_text(json.dumps(results, indent=2))
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            regressions = find_regressions(
+                results,
+                baseline,
+                options['tolerance'],
+            )
+            if regressions:
+                raise CommandError(
+                    'Результаты хуже прежних: ' + ', '.join(regressions),
+                )
+            self.stdout.write('Ухудшений нет')
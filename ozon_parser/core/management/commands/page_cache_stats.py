@@ -0,0 +1,21 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from core.page_cache import page_cache
+
+
+class Command(BaseCommand):
+    """Вывод счетчиков кэша страниц."""
+
+    help = 'Показывает попадания и промахи кэша страниц по типам'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Вывод счетчиков.
+
+        Args:
+            args: позиционные аргументы.
+            options: аргументы команды.
+        """
+        for name, value in sorted(page_cache.stats().items()):
+            self.stdout.write(f'{name}: {value}')
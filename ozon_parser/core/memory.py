@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PROC = Path('/proc')
+MB = 1024 * 1024
+
+
+def get_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Размер резидентной памяти процесса.
+
+    Память читается из /proc, поэтому на других системах размер
+    неизвестен.
+
+    Args:
+        pid: id процесса, по умолчанию текущий.
+
+    Returns:
+        Размер в байтах или None, если его не удалось определить.
+    """
+    try:
+        with open(PROC / str(pid or 'self') / 'status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return 0
+
+
+def get_children(pids: Iterable[int]) -> Dict[int, List[int]]:
+    """Дочерние процессы, найденные по /proc/<pid>/stat.
+
+    Args:
+        pids: id процессов, потомки которых нужны.
+
+    Returns:
+        Словарь id родителя -> id его дочерних процессов для всех
+        процессов системы.
+    """
+    children: Dict[int, List[int]] = {pid: [] for pid in pids}
+    try:
+        entries = os.listdir(PROC)
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            stat = (PROC / entry / 'stat').read_text()
+            parent = int(stat.rpartition(')')[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    return children
+
+
+def get_tree_rss(pids: Iterable[int]) -> Optional[int]:
+    """Суммарная резидентная память процессов и всех их потомков.
+
+    Args:
+        pids: id корневых процессов.
+
+    Returns:
+        Размер в байтах или None, если память процессов недоступна.
+    """
+    roots = list(pids)
+    if not roots:
+        return None
+    children = get_children(roots)
+    seen = set()
+    stack = roots
+    total = None
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        rss = get_rss(pid)
+        if rss is not None:
+            total = (total or 0) + rss
+        stack.extend(children.get(pid, ()))
+    return total
@@ -0,0 +1,264 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import redis
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+
+from core.constants import MEMORY_BUCKETS, METRIC_BUCKETS
+from core.memory import MB, get_rss
+from ozon_parser.celery import logger
+
+NO_TASK = '-'
+
+current_task_name: ContextVar[str] = ContextVar(
+    'current_task_name',
+    default=NO_TASK,
+)
+task_started_rss: ContextVar[Optional[int]] = ContextVar(
+    'task_started_rss',
+    default=None,
+)
+T = TypeVar('T')
+
+
+def get_bucket_labels(buckets: Tuple[float, ...]) -> List[str]:
+    """Подписи корзин гистограммы.
+
+    Args:
+        buckets: верхние границы корзин в секундах.
+
+    Returns:
+        Подписи корзин, последняя - для значений больше всех границ.
+    """
+    return [str(bound) for bound in buckets] + ['inf']
+
+
+def estimate_quantile(
+    buckets: Tuple[float, ...],
+    counts: List[int],
+    quantile: float,
+) -> float:
+    """Оценка квантиля по гистограмме.
+
+    Внутри корзины значения считаются распределенными равномерно. Для
+    последней корзины без верхней границы возвращается ее нижняя
+    граница.
+
+    Args:
+        buckets: верхние границы корзин в секундах.
+        counts: количество значений в каждой корзине.
+        quantile: квантиль от 0 до 1.
+
+    Returns:
+        Оценку квантиля в секундах.
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if seen + count >= rank and count:
+            if index >= len(buckets):
+                return float(buckets[-1])
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - seen) / count
+        seen += count
+    return float(buckets[-1])
+
+
+class MetricsRegistry:
+    """Гистограммы замеров этапов парсинга по задачам Celery.
+
+    Замеры копятся в памяти процесса и по окончании каждой задачи
+    прибавляются к общим гистограммам в Redis, поэтому статистика
+    собирается со всех воркеров. Имя задачи берется из контекста, в
+    котором открыт замер. Единицы замеров задаются границами корзин.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.METRICS_URL,
+        buckets: Tuple[float, ...] = METRIC_BUCKETS,
+        prefix: str = 'metrics',
+    ) -> None:
+        self.redis = redis.Redis.from_url(url)
+        self.buckets = buckets
+        self.prefix = prefix
+        self.keys_key = f'{prefix}:keys'
+        self.labels = get_bucket_labels(buckets)
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, str], List[int]] = {}
+        self._sums: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, stage: str, value: float) -> None:
+        """Учет замера этапа.
+
+        Args:
+            stage: имя этапа.
+            value: значение замера, например длительность в секундах.
+        """
+        key = (current_task_name.get(), stage)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.labels)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Замер длительности блока with.
+
+        Длительность учитывается и при выходе из блока по исключению.
+
+        Args:
+            stage: имя этапа.
+
+        Yields:
+            None.
+        """
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, perf_counter() - started)
+
+    def flush(self) -> None:
+        """Перенос накопленных замеров в Redis."""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            sums, self._sums = self._sums, {}
+        if not counts:
+            return
+        pipeline = self.redis.pipeline(transaction=False)
+        for (task, stage), stage_counts in counts.items():
+            key = f'{self.prefix}:{task}:{stage}'
+            pipeline.sadd(self.keys_key, key)
+            pipeline.hincrby(key, 'count', sum(stage_counts))
+            pipeline.hincrbyfloat(key, 'sum', sums[(task, stage)])
+            for label, count in zip(self.labels, stage_counts):
+                if count:
+                    pipeline.hincrby(key, label, count)
+        try:
+            pipeline.execute()
+        except redis.RedisError as err:
+            logger.warning(f'Не удалось сохранить метрики: {err}')
+
+    def collect(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Получение гистограмм всех воркеров.
+
+        Returns:
+            Словарь задача -> этап -> количество замеров, сумма и
+            среднее значение, оценки p50 и p95 и корзины.
+        """
+        keys = sorted(
+            key.decode() for key in self.redis.smembers(self.keys_key)
+        )
+        pipeline = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hgetall(key)
+        report: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for key, values in zip(keys, pipeline.execute()):
+            if not values:
+                continue
+            values = {name.decode(): value for name, value in values.items()}
+            _, task, stage = key.split(':', 2)
+            counts = [int(values.get(label, 0)) for label in self.labels]
+            count = int(values.get('count', 0))
+            total = float(values.get('sum', 0))
+            report.setdefault(task, {})[stage] = {
+                'count': count,
+                'sum': round(total, 6),
+                'mean': round(total / count, 6) if count else 0.0,
+                'p50': round(estimate_quantile(self.buckets, counts, 0.5), 6),
+                'p95': round(estimate_quantile(self.buckets, counts, 0.95), 6),
+                'buckets': dict(zip(self.labels, counts)),
+            }
+        return report
+
+    def reset(self) -> None:
+        """Удаление всех накопленных гистограмм."""
+        with self._lock:
+            self._counts = {}
+            self._sums = {}
+        keys = list(self.redis.smembers(self.keys_key))
+        self.redis.delete(self.keys_key, *keys)
+
+
+metrics = MetricsRegistry()
+memory_metrics = MetricsRegistry(buckets=MEMORY_BUCKETS, prefix='memory')
+
+
+def bind_context(function: Callable[..., T]) -> Callable[..., T]:
+    """Привязка функции к текущему контексту для запуска в других потоках.
+
+    Потоки пула не наследуют контекст, поэтому без этого замеры в них
+    не были бы привязаны к задаче.
+
+    Args:
+        function: вызываемая функция.
+
+    Returns:
+        Функцию, выполняющуюся в копии текущего контекста.
+    """
+    context = copy_context()
+
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        return context.copy().run(function, *args, **kwargs)
+
+    return wrapper
+
+
+@task_prerun.connect
+def start_task_metrics(task: Any = None, **kwargs: Any) -> None:
+    """Привязка замеров к запущенной задаче Celery.
+
+    Args:
+        task: запущенная задача.
+        kwargs: аргументы сигнала.
+    """
+    current_task_name.set(getattr(task, 'name', NO_TASK))
+    task_started_rss.set(get_rss())
+
+
+@task_postrun.connect
+def flush_task_metrics(**kwargs: Any) -> None:
+    """Учет памяти воркера и перенос замеров в Redis после задачи Celery.
+
+    Память воркера учитывается в МБ: размер после задачи и прирост за
+    время задачи.
+
+    Args:
+        kwargs: аргументы сигнала.
+    """
+    started, finished = task_started_rss.get(), get_rss()
+    if finished is not None:
+        memory_metrics.observe('worker.rss', finished / MB)
+        if started is not None:
+            memory_metrics.observe(
+                'worker.growth',
+                max(0, finished - started) / MB,
+            )
+    metrics.flush()
+    memory_metrics.flush()
+    current_task_name.set(NO_TASK)
+    task_started_rss.set(None)
@@ -0,0 +1,194 @@
+import zlib
+from hashlib import sha1
+from time import monotonic, sleep, time
+from typing import Dict, Optional
+
+import redis
+from django.conf import settings
+from redis.lock import Lock
+
+from core.constants import (
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_TTL,
+    PAGE_LOCK_POLL_INTERVAL,
+    PAGE_LOCK_TIMEOUT,
+)
+from ozon_parser.celery import logger
+
+PAGE_KEY = 'page:{}'
+LOCK_KEY = 'page_lock:{}'
+INDEX_KEY = 'page_cache:index'
+SIZES_KEY = 'page_cache:sizes'
+TOTAL_KEY = 'page_cache:total'
+STATS_KEY = 'page_cache:stats'
+
+
+class PageCache:
+    """Сжатый кэш html страниц в Redis.
+
+    Время жизни страницы зависит от ее типа. Когда суммарный размер
+    записей превышает max_bytes, удаляются самые старые. Ошибки Redis
+    не прерывают парсинг: страница просто загружается заново.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES,
+        ttls: Dict[str, int] = PAGE_CACHE_TTL,
+    ) -> None:
+        self.client = redis.Redis.from_url(url)
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+
+    @staticmethod
+    def get_key(url: str) -> str:
+        """Ключ Redis для адреса страницы.
+
+        Args:
+            url: адрес страницы.
+
+        Returns:
+            Ключ записи.
+        """
+        return PAGE_KEY.format(sha1(url.encode()).hexdigest())
+
+    def get(self, url: str, page_type: str) -> Optional[str]:
+        """Получение страницы из кэша.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+
+        Returns:
+            html страницы или None, если ее нет в кэше.
+        """
+        try:
+            data = self.client.get(self.get_key(url))
+            self.client.hincrby(
+                STATS_KEY,
+                f'{page_type}:{"hits" if data else "misses"}',
+            )
+        except redis.RedisError as err:
+            logger.warning(f'Кэш страниц недоступен: {err}')
+            return None
+        if data is None:
+            return None
+        logger.info(f'Страница {url} взята из кэша')
+        return zlib.decompress(data).decode()
+
+    def set(self, url: str, page_type: str, html: str) -> None:
+        """Сохранение страницы в кэш.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+            html: html страницы.
+        """
+        key = self.get_key(url)
+        data = zlib.compress(html.encode())
+        try:
+            previous = int(self.client.hget(SIZES_KEY, key) or 0)
+            pipeline = self.client.pipeline()
+            pipeline.set(
+                key,
+                data,
+                ex=self.ttls.get(page_type, self.ttls['page']),
+            )
+            pipeline.zadd(INDEX_KEY, {key: time()})
+            pipeline.hset(SIZES_KEY, key, len(data))
+            pipeline.incrby(TOTAL_KEY, len(data) - previous)
+            pipeline.execute()
+            self.evict()
+        except redis.RedisError as err:
+            logger.warning(f'Кэш страниц недоступен: {err}')
+
+    def lock(self, url: str) -> Optional[Lock]:
+        """Захват права загрузить страницу для всех задач.
+
+        Пока блокировка держится, другие задачи не загружают ту же
+        страницу, а ждут ее появления в кэше.
+
+        Args:
+            url: адрес страницы.
+
+        Returns:
+            Захваченная блокировка или None, если страницу уже
+            загружает другая задача.
+        """
+        lock = self.client.lock(
+            LOCK_KEY.format(self.get_key(url)),
+            timeout=PAGE_LOCK_TIMEOUT,
+            thread_local=False,
+        )
+        try:
+            acquired = lock.acquire(blocking=False)
+        except redis.RedisError as err:
+            logger.warning(f'Кэш страниц недоступен: {err}')
+            return None
+        return lock if acquired else None
+
+    def wait(self, url: str, page_type: str) -> Optional[str]:
+        """Ожидание страницы, которую загружает другая задача.
+
+        Args:
+            url: адрес страницы.
+            page_type: тип страницы.
+
+        Returns:
+            html страницы или None, если она не появилась в кэше.
+        """
+        lock_key = LOCK_KEY.format(self.get_key(url))
+        deadline = monotonic() + PAGE_LOCK_TIMEOUT
+        try:
+            while self.client.exists(lock_key) and monotonic() < deadline:
+                sleep(PAGE_LOCK_POLL_INTERVAL)
+        except redis.RedisError as err:
+            logger.warning(f'Кэш страниц недоступен: {err}')
+            return None
+        return self.get(url, page_type)
+
+    @staticmethod
+    def release(lock: Optional[Lock]) -> None:
+        """Освобождение блокировки загрузки страницы.
+
+        Args:
+            lock: блокировка, полученная из lock.
+        """
+        if lock is None:
+            return
+        try:
+            lock.release()
+        except redis.RedisError as err:
+            logger.warning(f'Не удалось снять блокировку страницы: {err}')
+
+    def evict(self) -> None:
+        """Удаление самых старых записей сверх max_bytes."""
+        while int(self.client.get(TOTAL_KEY) or 0) > self.max_bytes:
+            oldest = self.client.zpopmin(INDEX_KEY)
+            if not oldest:
+                self.client.set(TOTAL_KEY, 0)
+                return
+            key = oldest[0][0]
+            size = int(self.client.hget(SIZES_KEY, key) or 0)
+            pipeline = self.client.pipeline()
+            pipeline.delete(key)
+            pipeline.hdel(SIZES_KEY, key)
+            pipeline.decrby(TOTAL_KEY, size)
+            pipeline.execute()
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов по типам страниц.
+
+        Returns:
+            Словарь счетчиков и суммарный размер кэша в байтах.
+        """
+        stats = {
+            name.decode(): int(value)
+            for name, value in self.client.hgetall(STATS_KEY).items()
+        }
+        stats['bytes'] = int(self.client.get(TOTAL_KEY) or 0)
+        return stats
+
+
+page_cache = PageCache(settings.PAGE_CACHE_URL)
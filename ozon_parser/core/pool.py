@@ -0,0 +1,238 @@
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Any, Callable, Iterator, List, Optional
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from selenium.common.exceptions import WebDriverException
+
+from core.constants import (
+    DRIVER_BLANK_URL,
+    DRIVER_MAX_PAGES,
+    DRIVER_MAX_RSS_MB,
+    DRIVER_POOL_SIZE,
+    DRIVER_POOL_TIMEOUT,
+)
+from core.memory import MB, get_tree_rss
+from core.metrics import memory_metrics, metrics
+from core.utils import start_driver
+from ozon_parser.celery import logger
+
+
+class PooledDriver:
+    """Обертка над драйвером Chrome, считающая загруженные страницы.
+
+    Все атрибуты, кроме get, передаются исходному драйверу, поэтому
+    обертку можно использовать везде, где ожидается драйвер.
+    """
+
+    def __init__(self, driver: Any) -> None:
+        self.driver = driver
+        self.pages = 0
+        self.broken = False
+
+    def get(self, url: str) -> None:
+        """Переход по адресу с учетом количества загруженных страниц.
+
+        Args:
+            url: адрес страницы.
+        """
+        self.pages += 1
+        self.driver.get(url)
+
+    def __getattr__(self, name: str) -> Any:
+        """Передача остальных атрибутов исходному драйверу.
+
+        Args:
+            name: имя атрибута.
+
+        Returns:
+            Атрибут исходного драйвера.
+        """
+        return getattr(self.driver, name)
+
+    def is_alive(self) -> bool:
+        """Проверка работоспособности драйвера.
+
+        Returns:
+            True, если браузер отвечает на команды.
+        """
+        try:
+            self.driver.execute_script('return 1')
+        except WebDriverException:
+            return False
+        return True
+
+    def reset(self) -> None:
+        """Переход на пустую страницу, освобождающий память вкладки.
+
+        Переход не учитывается в количестве загруженных страниц. Если
+        браузер не ответил, драйвер помечается сломанным.
+        """
+        try:
+            self.driver.get(DRIVER_BLANK_URL)
+        except WebDriverException as err:
+            logger.warning(f'Не удалось очистить вкладку: {err}')
+            self.broken = True
+
+    def get_rss(self) -> Optional[int]:
+        """Память, занятая браузером и chromedriver.
+
+        Returns:
+            Размер в байтах или None, если его не удалось определить.
+        """
+        service = getattr(self.driver, 'service', None)
+        pids = (
+            getattr(self.driver, 'browser_pid', None),
+            getattr(getattr(service, 'process', None), 'pid', None),
+        )
+        return get_tree_rss(pid for pid in pids if pid)
+
+    def quit(self) -> None:
+        """Закрытие браузера без выброса исключений."""
+        try:
+            self.driver.quit()
+        except WebDriverException as err:
+            logger.warning(f'Не удалось закрыть драйвер: {err}')
+
+
+class DriverPool:
+    """Пул прогретых драйверов Chrome, общий для задач одного воркера.
+
+    Драйверы создаются по требованию, но не более max_size одновременно.
+    Драйвер пересоздается после max_pages страниц, после сбоя или когда
+    браузер занимает больше max_rss_mb МБ. Между страницами вкладка
+    очищается переходом на пустую страницу. Драйверы создаются функцией
+    factory.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DRIVER_POOL_SIZE,
+        max_pages: int = DRIVER_MAX_PAGES,
+        timeout: float = DRIVER_POOL_TIMEOUT,
+        factory: Callable[[], Any] = start_driver,
+        max_rss_mb: int = DRIVER_MAX_RSS_MB,
+    ) -> None:
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.timeout = timeout
+        self.factory = factory
+        self._condition = threading.Condition()
+        self._idle: List[PooledDriver] = []
+        self._size = 0
+
+    def _acquire(self) -> PooledDriver:
+        """Получение свободного драйвера из пула.
+
+        Returns:
+            Работоспособный драйвер.
+
+        Raises:
+            TimeoutError: если свободный драйвер не появился за timeout.
+        """
+        deadline = monotonic() + self.timeout
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        'Не дождались свободного драйвера '
+                        f'за {self.timeout} секунд',
+                    )
+                self._condition.wait(remaining)
+            if self._idle:
+                pooled = self._idle.pop()
+            else:
+                pooled = None
+                self._size += 1
+        if pooled is not None and pooled.is_alive():
+            return pooled
+        if pooled is not None:
+            logger.warning('Драйвер не отвечает, запускаю новый')
+            pooled.quit()
+        try:
+            pooled = PooledDriver(self.factory())
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        logger.info('Драйвер запущен')
+        return pooled
+
+    def _check_memory(self, pooled: PooledDriver) -> None:
+        """Учет памяти браузера и отметка о перезапуске при превышении.
+
+        Args:
+            pooled: проверяемый драйвер.
+        """
+        rss = pooled.get_rss()
+        if rss is None:
+            return
+        memory_metrics.observe('browser.rss', rss / MB)
+        if self.max_rss_mb and rss > self.max_rss_mb * MB:
+            logger.info(f'Драйвер занимает {rss // MB} МБ, перезапускаю')
+            pooled.broken = True
+
+    def _release(self, pooled: PooledDriver) -> None:
+        """Возврат драйвера в пул или его утилизация.
+
+        Args:
+            pooled: возвращаемый драйвер.
+        """
+        if not pooled.broken and pooled.pages < self.max_pages:
+            pooled.reset()
+            self._check_memory(pooled)
+        if pooled.broken or pooled.pages >= self.max_pages:
+            logger.info(
+                f'Драйвер закрыт после {pooled.pages} страниц',
+            )
+            pooled.quit()
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            return
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    @contextmanager
+    def driver(self) -> Iterator[PooledDriver]:
+        """Выдача драйвера из пула на время блока with.
+
+        Yields:
+            Драйвер, который вернется в пул по выходу из блока.
+        """
+        with metrics.span('driver.acquire'):
+            pooled = self._acquire()
+        try:
+            yield pooled
+        except WebDriverException:
+            pooled.broken = True
+            raise
+        finally:
+            self._release(pooled)
+
+    def close(self) -> None:
+        """Закрытие всех свободных драйверов пула."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for pooled in idle:
+            pooled.quit()
+
+
+driver_pool = DriverPool()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_driver_pool(**kwargs: Any) -> None:
+    """Закрытие браузеров пула при остановке воркера Celery.
+
+    Args:
+        kwargs: аргументы сигнала.
+    """
+    driver_pool.close()
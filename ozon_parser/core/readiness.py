@@ -0,0 +1,346 @@
+import threading
+from time import monotonic, sleep
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+
+from core.constants import (
+    JSON_STATE_TAGS,
+    NETWORK_IDLE_TIME,
+    PRODUCT_PAGE_MARK,
+    READINESS_MAX_TIMEOUT,
+    READINESS_MIN_TIMEOUT,
+    READINESS_POLL_FREQUENCY,
+    SELLER_PAGE_MARK,
+    THROTTLE_BACKOFF_BASE,
+    THROTTLE_BACKOFF_MAX,
+    THROTTLE_MARKERS,
+)
+from ozon_parser.celery import logger
+
+NETWORK_IDLE_SCRIPT = """
+performance.setResourceTimingBufferSize(10000);
+const entries = performance.getEntriesByType('resource');
+let lastEnd = 0;
+for (const entry of entries) {
+    lastEnd = Math.max(lastEnd, entry.responseEnd);
+}
+return performance.now() - lastEnd;
+"""
+JSON_STATE_SCRIPT = """
+return document.querySelector('[id^="state-' + arguments[0] + '-"]') !== null;
+"""
+
+
+class DocumentReady:
+    """Условие готовности: document.readyState равен complete."""
+
+    def __call__(self, driver: Any) -> bool:
+        """Проверка условия.
+
+        Args:
+            driver: используемый драйвер.
+
+        Returns:
+            True, если документ загружен.
+        """
+        return driver.execute_script('return document.readyState') == (
+            'complete'
+        )
+
+
+class SelectorReady:
+    """Условие готовности: на странице есть элемент по css-селектору."""
+
+    def __init__(self, css_selector: str) -> None:
+        self.css_selector = css_selector
+
+    def __call__(self, driver: Any) -> bool:
+        """Проверка условия.
+
+        Args:
+            driver: используемый драйвер.
+
+        Returns:
+            True, если элемент найден.
+        """
+        return bool(driver.find_elements(By.CSS_SELECTOR, self.css_selector))
+
+
+class NetworkIdle:
+    """Условие готовности: ресурсы не загружались idle_time секунд.
+
+    Используются записи Resource Timing, поэтому незавершенные запросы
+    не учитываются, и условие является приближением.
+    """
+
+    def __init__(self, idle_time: float = NETWORK_IDLE_TIME) -> None:
+        self.idle_time = idle_time
+
+    def __call__(self, driver: Any) -> bool:
+        """Проверка условия.
+
+        Args:
+            driver: используемый драйвер.
+
+        Returns:
+            True, если сеть простаивает.
+        """
+        idle = driver.execute_script(NETWORK_IDLE_SCRIPT)
+        return idle is not None and idle >= self.idle_time * 1000
+
+
+class JsonStateReady:
+    """Условие готовности: в html есть блок состояния виджета Ozon.
+
+    Блок ищется по id вида state-<widget>-<номер>, как в
+    find_widget_state. Проверяется селектором, без сериализации всего
+    документа на каждом опросе.
+    """
+
+    def __init__(self, widget: str) -> None:
+        self.widget = widget
+
+    def __call__(self, driver: Any) -> bool:
+        """Проверка условия.
+
+        Args:
+            driver: используемый драйвер.
+
+        Returns:
+            True, если блок состояния найден.
+        """
+        return bool(driver.execute_script(JSON_STATE_SCRIPT, self.widget))
+
+
+def is_throttled(text: str) -> bool:
+    """Проверка, что Ozon ограничил доступ к странице.
+
+    Args:
+        text: заголовок или html страницы.
+
+    Returns:
+        True, если найдена метка страницы ограничения доступа.
+    """
+    return any(marker in text for marker in THROTTLE_MARKERS)
+
+
+class LatencyTracker:
+    """Статистика времени готовности страниц по типам.
+
+    Среднее и отклонение считаются скользящим образом, как RTO в TCP,
+    и определяют время ожидания для следующей страницы того же типа.
+    Истекшее ожидание не является замером времени готовности, поэтому
+    оно не меняет среднее, а только увеличивает отклонение.
+    """
+
+    def __init__(
+        self,
+        min_timeout: float = READINESS_MIN_TIMEOUT,
+        max_timeout: float = READINESS_MAX_TIMEOUT,
+    ) -> None:
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Tuple[float, float]] = {}
+
+    def record(self, page_type: str, elapsed: float) -> None:
+        """Учет времени готовности страницы.
+
+        Args:
+            page_type: тип страницы.
+            elapsed: время от перехода до готовности в секундах.
+        """
+        with self._lock:
+            if page_type not in self._stats:
+                self._stats[page_type] = (elapsed, elapsed / 2)
+                return
+            mean, deviation = self._stats[page_type]
+            deviation = 0.75 * deviation + 0.25 * abs(elapsed - mean)
+            mean = 0.875 * mean + 0.125 * elapsed
+            self._stats[page_type] = (mean, deviation)
+
+    def record_timeout(self, page_type: str) -> None:
+        """Учет страницы, не дождавшейся готовности.
+
+        Отклонение удваивается, но не больше, чем нужно для достижения
+        max_timeout, поэтому время ожидания растет, пока страницы не
+        начнут успевать, и быстро снижается после первого успеха. Пока
+        замеров нет, время ожидания и так максимальное.
+
+        Args:
+            page_type: тип страницы.
+        """
+        with self._lock:
+            if page_type not in self._stats:
+                return
+            mean, deviation = self._stats[page_type]
+            deviation = min(
+                max(2 * deviation, mean / 4),
+                max(0.0, self.max_timeout - mean) / 4,
+            )
+            self._stats[page_type] = (mean, deviation)
+
+    def timeout(self, page_type: str) -> float:
+        """Время ожидания готовности для типа страницы.
+
+        Args:
+            page_type: тип страницы.
+
+        Returns:
+            Время ожидания в секундах.
+        """
+        with self._lock:
+            stats = self._stats.get(page_type)
+        if stats is None:
+            return self.max_timeout
+        mean, deviation = stats
+        return min(
+            self.max_timeout,
+            max(self.min_timeout, mean + 4 * deviation),
+        )
+
+
+latency_tracker = LatencyTracker()
+
+
+class Readiness:
+    """Набор условий, при выполнении которых страница считается готовой."""
+
+    def __init__(self, page_type: str, conditions: Iterable[Any]) -> None:
+        self.page_type = page_type
+        self.conditions = tuple(conditions)
+
+    def _check(self, driver: Any) -> bool:
+        if is_throttled(driver.title):
+            return True
+        return all(condition(driver) for condition in self.conditions)
+
+    def wait(self, driver: Any, started: Optional[float] = None) -> bool:
+        """Ожидание готовности страницы.
+
+        Args:
+            driver: используемый драйвер.
+            started: момент начала перехода по monotonic.
+
+        Returns:
+            True, если страница готова или Ozon ограничил доступ.
+        """
+        if started is None:
+            started = monotonic()
+        timeout = latency_tracker.timeout(self.page_type)
+        try:
+            WebDriverWait(
+                driver,
+                timeout,
+                poll_frequency=READINESS_POLL_FREQUENCY,
+                ignored_exceptions=(JavascriptException,),
+            ).until(self._check)
+        except TimeoutException:
+            latency_tracker.record_timeout(self.page_type)
+            return False
+        latency_tracker.record(self.page_type, monotonic() - started)
+        return True
+
+
+READINESS_PROFILES = {
+    SELLER_PAGE_MARK: Readiness(
+        'seller',
+        (DocumentReady(), SelectorReady(SELLER_PAGE_MARK), NetworkIdle()),
+    ),
+    PRODUCT_PAGE_MARK: Readiness(
+        'product',
+        (
+            DocumentReady(),
+            SelectorReady(PRODUCT_PAGE_MARK),
+            JsonStateReady(JSON_STATE_TAGS['name']['widget']),
+            NetworkIdle(),
+        ),
+    ),
+}
+DEFAULT_READINESS = Readiness('page', (DocumentReady(), NetworkIdle()))
+readiness_lock = threading.Lock()
+
+
+def get_readiness(css_selector: str = '') -> Readiness:
+    """Получение условий готовности по css-селектору страницы.
+
+    Условия для новых селекторов создаются под блокировкой, потому что
+    функцию одновременно вызывают потоки fetch_pages.
+
+    Args:
+        css_selector: селектор, появление которого ожидается.
+
+    Returns:
+        Условия готовности страницы.
+    """
+    if not css_selector:
+        return DEFAULT_READINESS
+    readiness = READINESS_PROFILES.get(css_selector)
+    if readiness is not None:
+        return readiness
+    with readiness_lock:
+        return READINESS_PROFILES.setdefault(
+            css_selector,
+            Readiness(
+                css_selector,
+                (DocumentReady(), SelectorReady(css_selector), NetworkIdle()),
+            ),
+        )
+
+
+class ThrottleBackoff:
+    """Экспоненциальная задержка перед запросами к ограничившему хосту."""
+
+    def __init__(
+        self,
+        base: float = THROTTLE_BACKOFF_BASE,
+        maximum: float = THROTTLE_BACKOFF_MAX,
+    ) -> None:
+        self.base = base
+        self.maximum = maximum
+        self._lock = threading.Lock()
+        self._delays: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        """Ожидание перед запросом, если хост ограничивал доступ.
+
+        Args:
+            url: адрес страницы.
+        """
+        with self._lock:
+            delay = self._delays.get(urlsplit(url).netloc, 0)
+        if delay:
+            logger.info(f'Жду {delay} секунд перед загрузкой {url}')
+            sleep(delay)
+
+    def penalize(self, url: str) -> None:
+        """Увеличение задержки после ограничения доступа.
+
+        Args:
+            url: адрес страницы.
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            delay = self._delays.get(host, 0)
+            self._delays[host] = min(self.maximum, max(self.base, delay * 2))
+
+    def relax(self, url: str) -> None:
+        """Уменьшение задержки после успешной загрузки.
+
+        Args:
+            url: адрес страницы.
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            delay = self._delays.get(host, 0) / 2
+            if delay < self.base:
+                self._delays.pop(host, None)
+            else:
+                self._delays[host] = delay
+
+
+throttle_backoff = ThrottleBackoff()
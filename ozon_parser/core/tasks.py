@@ -1,81 +1,361 @@
 from datetime import datetime
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
 
-from bs4 import BeautifulSoup
+from celery import Task, chord
+from selenium.common.exceptions import WebDriverException
 
-from bot.tasks import send_message
-from core.constants import PRODUCT_PAGE_MARK
-from core.utils import (
+from bot.tasks import notify
+from core.catalog import (
     count_pages,
-    get_html,
+    count_saved_ids,
+    filter_new_ids,
+    filter_stale_ids,
     get_new_products,
-    get_ozon_product_url,
-    get_product,
-    start_driver,
+    get_stale_products,
 )
+from core.constants import (
+    FETCH_CONCURRENCY,
+    PAGINATION_LOOKAHEAD,
+    PARSE_CHUNK_RETRIES,
+    PARSE_CHUNK_SIZE,
+    PRODUCT_PAGE_MARK,
+    REFRESH_MAX_AGE_HOURS,
+)
+from core.fetch import fetch_pages
+from core.jobs import (
+    acquire_job,
+    create_job,
+    finish_job,
+    increment_job,
+    release_job,
+    update_job,
+)
+from core.metrics import metrics
+from core.utils import get_ozon_product_url, get_product, split_into_chunks
+from core.writers import ProductWriter, clear_plan, load_plan, save_plan
 from ozon_parser.celery import app, logger
 from products.models import Product
 
 
-@app.task
-def parse_ozon_seller(url: str, products_count: int) -> None:
-    """Парсинг страницы продавца на Ozon.
+def plan_products(
+    job_id: Optional[str],
+    url: str,
+    products_count: int,
+    lookahead: int,
+    refresh: bool,
+    max_age: int,
+) -> Tuple[List[int], datetime]:
+    """Выбор товаров, которые должна обработать задача.
+
+    Если задача уже запускалась, берется сохраненный план без товаров,
+    записанных до прерывания.
 
     Args:
+        job_id: id задачи Celery.
         url: адрес главной страницы.
         products_count: необходимое количество продуктов.
+        lookahead: количество страниц каталога, загружаемых наперед.
+        refresh: обновлять ли уже сохраненные товары вместо поиска новых.
+        max_age: возраст данных в часах, после которого они устарели.
 
     Returns:
-        Response с информацией об ошибках создания или статус-код 201.
+        Список id товаров и дату создания запроса.
     """
+    plan = load_plan(job_id)
+    if plan is not None:
+        logger.info('Продолжаю прерванную задачу')
+        request_date = plan['request_date']
+        if plan['refresh']:
+            return (
+                filter_stale_ids(plan['ozon_ids'], request_date),
+                request_date,
+            )
+        return filter_new_ids(plan['ozon_ids']), request_date
     request_date = datetime.now()
-    driver = start_driver()
-    logger.info('Драйвер запущен')
-    pages_count, html = count_pages(driver, url)
-    new_ids = get_new_products(driver, url, html, pages_count, products_count)
-    logger.info(f'Выбрано новых элементов: {len(new_ids)}')
-    saved_products = []
-    success_products = 0
-    problems = False
-    for product_id in new_ids:
-        product_html = get_html(
-            driver,
-            get_ozon_product_url(product_id),
-            PRODUCT_PAGE_MARK,
+    if refresh:
+        ozon_ids = get_stale_products(products_count, max_age)
+    else:
+        pages_count, html = count_pages(url)
+        increment_job(job_id, 'pages')
+        ozon_ids = get_new_products(
+            url,
+            html,
+            pages_count,
+            products_count,
+            lookahead,
+            on_page=lambda: increment_job(job_id, 'pages'),
         )
-        product_soup = BeautifulSoup(product_html, 'lxml')
-        serializer = get_product(product_soup, product_id, request_date)
-        if not serializer.is_valid():
-            message = (
-                'Задача на парсинг товаров с сайта Ozon '
-                'завершена преждевременно.'
-                f'Товары не сохранены.'
-                f'Были замечены следующие ошибки: {serializer.errors}'
-            )
-            send_message.delay(message)
-            logger.error(message)
-            problems = True
-        else:
-            success_products += 1
-            saved_products.append(serializer)
-    driver.close()
-    driver.quit()
-    Product.objects.bulk_create(
-        [
-            Product(**serializer.validated_data)
-            for serializer in saved_products
-        ],
+    save_plan(job_id, ozon_ids, request_date, refresh)
+    return ozon_ids, request_date
+
+
+@app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def parse_ozon_seller(
+    self: Task,
+    url: str,
+    products_count: int,
+    concurrency: int = FETCH_CONCURRENCY,
+    lookahead: int = PAGINATION_LOOKAHEAD,
+    refresh: bool = False,
+    max_age: int = REFRESH_MAX_AGE_HOURS,
+    chunk_size: int = PARSE_CHUNK_SIZE,
+) -> None:
+    """Парсинг страницы продавца на Ozon.
+
+    Задача только выбирает товары, а загружают и сохраняют их подзадачи
+    parse_products по chunk_size товаров, которые могут выполняться на
+    разных воркерах. Итог подводит finish_parsing, а если она не будет
+    вызвана из-за ошибки, задачу завершает fail_parsing. В режиме refresh
+    заново загружаются уже сохраненные товары, данные которых старше
+    max_age часов.
+
+    Args:
+        url: адрес главной страницы.
+        products_count: необходимое количество продуктов.
+        concurrency: количество одновременно загружаемых страниц товаров
+            в одной подзадаче.
+        lookahead: количество страниц каталога, загружаемых наперед.
+        refresh: обновлять ли уже сохраненные товары вместо поиска новых.
+        max_age: возраст данных в часах, после которого они устарели.
+        chunk_size: количество товаров в одной подзадаче.
+    """
+    update_job(self.request.id, status='planning')
+    try:
+        ozon_ids, request_date = plan_products(
+            self.request.id,
+            url,
+            products_count,
+            lookahead,
+            refresh,
+            max_age,
+        )
+    except Exception as err:
+        abort_parsing(self.request.id, url, refresh, err)
+        raise
+    logger.info(f'Выбрано элементов: {len(ozon_ids)}')
+    update_job(
+        self.request.id,
+        status='fetching',
+        total=len(ozon_ids),
+        started_at=time(),
     )
-    if problems:
+    callback = finish_parsing.s(self.request.id, url, refresh).on_error(
+        fail_parsing.s(self.request.id, url, refresh),
+    )
+    if not ozon_ids:
+        callback.delay([])
+        return
+    chord(
+        parse_products.s(
+            chunk,
+            request_date.isoformat(),
+            refresh,
+            concurrency,
+            self.request.id,
+        )
+        for chunk in split_into_chunks(ozon_ids, max(1, chunk_size))
+    )(callback)
+
+
+def start_parsing(
+    url: str,
+    products_count: int,
+    refresh: bool = False,
+    **options: Any,
+) -> Tuple[str, bool]:
+    """Запуск парсинга продавца, если он еще не запущен.
+
+    Пока задача по тому же продавцу в том же режиме не завершена,
+    повторные запросы получают ее id, а новая задача не создается.
+
+    Args:
+        url: адрес главной страницы.
+        products_count: необходимое количество продуктов.
+        refresh: обновлять ли уже сохраненные товары вместо поиска новых.
+        options: остальные аргументы parse_ozon_seller.
+
+    Returns:
+        id задачи и признак того, что она только что создана.
+    """
+    job_id = str(uuid4())
+    running = acquire_job(url, refresh, job_id)
+    if running != job_id:
+        logger.info(f'Парсинг {url} уже выполняет задача {running}')
+        return running, False
+    create_job(job_id, url, refresh)
+    try:
+        parse_ozon_seller.apply_async(
+            (url, products_count),
+            {'refresh': refresh, **options},
+            task_id=job_id,
+        )
+    except Exception as err:
+        abort_parsing(job_id, url, refresh, err)
+        raise
+    return job_id, True
+
+
+@app.task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    max_retries=PARSE_CHUNK_RETRIES,
+)
+def parse_products(
+    self: Task,
+    ozon_ids: List[int],
+    request_date: str,
+    refresh: bool = False,
+    concurrency: int = FETCH_CONCURRENCY,
+    job_id: Optional[str] = None,
+) -> Dict[str, int]:
+    """Загрузка и сохранение части товаров задачи.
+
+    Уже записанные товары пропускаются, поэтому при повторе подзадача
+    загружает только оставшиеся, а сохраненные товары в итогах
+    считаются по базе вместе с записанными прошлыми попытками. При
+    обновлении цен кэш страниц не используется.
+
+    Args:
+        ozon_ids: id товаров.
+        request_date: дата создания запроса в формате ISO.
+        refresh: обновляет ли задача уже сохраненные товары.
+        concurrency: количество одновременно загружаемых страниц товаров.
+        job_id: id задачи parse_ozon_seller, прогресс которой обновляется.
+
+    Returns:
+        Количество сохраненных и несохраненных товаров.
+    """
+    date = datetime.fromisoformat(request_date)
+    chunk_ids = ozon_ids
+    if refresh:
+        ozon_ids = filter_stale_ids(ozon_ids, date)
+    else:
+        ozon_ids = filter_new_ids(ozon_ids)
+    failed = 0
+    writer = ProductWriter()
+    try:
+        with writer:
+            product_htmls = fetch_pages(
+                [get_ozon_product_url(product_id) for product_id in ozon_ids],
+                PRODUCT_PAGE_MARK,
+                concurrency,
+                use_cache=not refresh,
+            )
+            for product_id, product_html in zip(ozon_ids, product_htmls):
+                increment_job(job_id, 'fetched')
+                serializer = get_product(product_html, product_id, date)
+                del product_html
+                with metrics.span('validate'):
+                    valid = serializer.is_valid()
+                if not valid:
+                    message = (
+                        f'Товар {product_id} с сайта Ozon не сохранен. '
+                        'Были замечены следующие ошибки: '
+                        f'{serializer.errors}'
+                    )
+                    notify(message)
+                    logger.error(message)
+                    increment_job(job_id, 'failed')
+                    failed += 1
+                else:
+                    writer.add(Product(**serializer.validated_data))
+    except (WebDriverException, TimeoutError) as err:
+        if self.request.retries < self.max_retries:
+            increment_job(job_id, 'saved', writer.saved)
+            raise self.retry(exc=err)
+        logger.error(f'Не удалось загрузить товары {ozon_ids}: {err}')
+        failed = len(ozon_ids) - writer.saved
+    increment_job(job_id, 'saved', writer.saved)
+    return {'saved': count_saved_ids(chunk_ids, date), 'failed': failed}
+
+
+@app.task
+def finish_parsing(
+    results: List[Dict[str, int]],
+    job_id: str,
+    url: Optional[str] = None,
+    refresh: bool = False,
+) -> None:
+    """Подведение итогов задачи на парсинг и оповещение в Telegram.
+
+    Args:
+        results: итоги подзадач parse_products.
+        job_id: id задачи parse_ozon_seller.
+        url: адрес страницы продавца.
+        refresh: обновляла ли задача уже сохраненные товары.
+    """
+    saved = sum(result['saved'] for result in results)
+    failed = sum(result['failed'] for result in results)
+    clear_plan(job_id)
+    finish_job(job_id, saved, failed)
+    if url is not None:
+        release_job(url, refresh, job_id)
+    if failed:
         message = (
             'Задача на парсинг товаров с сайта Ozon завершена не полностью. '
-            f'Сохранено: {saved_products} товаров.'
+            f'Сохранено: {saved} товаров, не сохранено: {failed}.'
         )
-        send_message.delay(message)
-        logger.info(message)
     else:
         message = (
             'Задача на парсинг товаров с сайта Ozon завершена. '
-            f'Сохранено: {products_count} товаров.'
+            f'Сохранено: {saved} товаров.'
         )
-        send_message.delay(message)
-        logger.info(message)
+    notify(message)
+    logger.info(message)
+
+
+def abort_parsing(
+    job_id: str,
+    url: Optional[str],
+    refresh: bool,
+    error: BaseException,
+) -> None:
+    """Завершение задачи на парсинг с ошибкой и оповещение в Telegram.
+
+    Регистрация задачи снимается сразу, чтобы продавца можно было
+    парсить снова, не дожидаясь JOB_LOCK_TIMEOUT.
+
+    Args:
+        job_id: id задачи parse_ozon_seller.
+        url: адрес страницы продавца.
+        refresh: обновляла ли задача уже сохраненные товары.
+        error: ошибка, из-за которой задача прервана.
+    """
+    clear_plan(job_id)
+    update_job(job_id, status='failed', finished_at=time())
+    if url is not None:
+        release_job(url, refresh, job_id)
+    message = (
+        'Задача на парсинг товаров с сайта Ozon прервана ошибкой: '
+        f'{error!r}.'
+    )
+    notify(message)
+    logger.error(message)
+
+
+@app.task
+def fail_parsing(
+    request: Any,
+    exc: BaseException,
+    traceback: Any,
+    job_id: str,
+    url: Optional[str] = None,
+    refresh: bool = False,
+) -> None:
+    """Обработка ошибки подзадачи parse_products или finish_parsing.
+
+    Ошибка подзадачи завершает chord ошибкой, и Celery вызывает эту
+    задачу вместо finish_parsing.
+
+    Args:
+        request: запрос задачи, завершившейся ошибкой.
+        exc: ошибка.
+        traceback: трассировка ошибки.
+        job_id: id задачи parse_ozon_seller.
+        url: адрес страницы продавца.
+        refresh: обновляла ли задача уже сохраненные товары.
+    """
+    abort_parsing(job_id, url, refresh, exc)
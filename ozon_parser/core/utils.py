@@ -1,24 +1,29 @@
 import re
 import unicodedata
 from datetime import datetime
-from time import sleep
-from typing import Any, List, Optional, Tuple
+from functools import lru_cache
+from itertools import islice
+from time import monotonic
+from typing import Any, List, Optional
 
 import undetected_chromedriver as uc
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
 from api.v1.serializers import ProductWriteSerializer
-from bot.tasks import send_message
-from core.constants import DATA_TAGS, OZON_PRODUCT_URL, SELLER_PAGE_MARK
+from bot.tasks import notify
+from core.blocking import resource_blocker
+from core.constants import DATA_TAGS, OZON_PRODUCT_URL, THROTTLE_RETRIES
+from core.extractors import (
+    PLAN_FIELDS,
+    get_dom_fields,
+    get_state_fields,
+    normalize_fields,
+)
+from core.metrics import metrics
+from core.readiness import get_readiness, is_throttled, throttle_backoff
 from ozon_parser.celery import logger
-from products.models import Product
 
 
 def extend_with_unique(list1: List[Any], list2: List[Any]) -> List[Any]:
@@ -31,17 +36,44 @@ def extend_with_unique(list1: List[Any], list2: List[Any]) -> List[Any]:
     Returns:
         Объединенный список уникальных элементов.
     """
+    seen = set(list1)
     for element in list2:
-        if element not in list1:
+        if element not in seen:
+            seen.add(element)
             list1.append(element)
     return list1
 
 
+def split_into_chunks(items: List[Any], size: int) -> List[List[Any]]:
+    """Метод разбиения списка на части заданного размера.
+
+    Args:
+        items: исходный список.
+        size: максимальный размер части.
+
+    Returns:
+        Список частей в исходном порядке.
+    """
+    iterator = iter(items)
+    return list(iter(lambda: list(islice(iterator, size)), []))
+
+
+@lru_cache(maxsize=None)
+def get_driver_path() -> str:
+    """Метод для однократной установки chromedriver в процессе.
+
+    Returns:
+        Путь к исполняемому файлу chromedriver.
+    """
+    return ChromeDriverManager().install()
+
+
 def start_driver() -> uc.Chrome:
     """Метод для создания драйвера Chrome.
 
     Returns:
-        Объект драйвера Chrome.
+        Объект драйвера Chrome с включенным доменом Network CDP, через
+        который запрещается загрузка лишних ресурсов.
     """
     options = uc.ChromeOptions()
     options.add_argument('--start-maximized')
@@ -49,52 +81,74 @@ def start_driver() -> uc.Chrome:
     options.add_argument('--user-agent={}'.format(UserAgent().chrome))
     options.add_argument('--headless')
     options.add_argument('--disable-blink-features=AutomationControlled')
-    driver = uc.Chrome(
-        driver_executable_path=ChromeDriverManager().install(),
-        options=options,
-    )
+    with metrics.span('driver.start'):
+        driver = uc.Chrome(
+            driver_executable_path=get_driver_path(),
+            options=options,
+        )
+        driver.execute_cdp_cmd('Network.enable', {})
     return driver
 
 
 def get_html(
-    driver: webdriver.Chrome,
+    driver: Any,
     url: str,
     css_selector: str = '',
 ) -> str:
     """Получение html сайта по его url.
 
+    Страница считается загруженной, когда выполнены условия готовности
+    для ее типа. Повторные попытки делаются, только если Ozon ограничил
+    доступ. Картинки, шрифты, видео и сторонние скрипты не загружаются,
+    если это разрешено для типа страницы.
+
     Args:
+        driver: используемый драйвер: Chrome, драйвер из пула или
+            ReplayDriver.
         url: строка url-адреса.
+        css_selector: селектор, появление которого ожидается.
 
     Returns:
         html страницы.
     """
-    sleep(3)
-    driver.get(url)
-    if css_selector:
-        try:
-            wait_delay = 100
-            WebDriverWait(driver, wait_delay).until(
-                EC.presence_of_all_elements_located(
-                    (By.CSS_SELECTOR, css_selector),
-                ),
+    readiness = get_readiness(css_selector)
+    for attempt in range(THROTTLE_RETRIES + 1):
+        with metrics.span('html.backoff'):
+            throttle_backoff.wait(url)
+        blocked = resource_blocker.apply(driver, readiness.page_type)
+        started = monotonic()
+        with metrics.span('html.navigate'):
+            driver.get(url)
+        with metrics.span('html.wait'):
+            ready = readiness.wait(driver, started)
+        resource_blocker.record(
+            driver,
+            readiness.page_type,
+            blocked,
+            monotonic() - started,
+        )
+        if ready:
+            logger.info(
+                f'Страница {url} загрузилась '
+                f'за {monotonic() - started:.1f} секунд',
             )
-            logger.info(f'Страница {url} загрузилась')
-            sleep_delay = 3
-            sleep(sleep_delay)
-        except TimeoutException:
+        else:
             message = (
                 f'Страница {url} загрузилась не до конца.\n'
                 'Возможно, будет необходимо вручную убедиться '
                 'в качестве записанной информации'
             )
-            send_message.delay(message)
+            notify(message)
             logger.warning(message)
-    else:
-        delay = 5
-        sleep(delay)
-        logger.info(f'Страница {url} загружалась {delay} секунд')
-    html = driver.page_source
+        with metrics.span('html.page_source'):
+            html = driver.page_source
+        if not is_throttled(html):
+            throttle_backoff.relax(url)
+            return html
+        throttle_backoff.penalize(url)
+        logger.warning(
+            f'Ozon ограничил доступ к {url}, попытка {attempt + 1}',
+        )
     return html
 
 
@@ -110,29 +164,6 @@ def get_ozon_product_url(product_id: int) -> str:
     return OZON_PRODUCT_URL + str(product_id)
 
 
-def count_pages(driver: uc.Chrome, url: str) -> Tuple[int, str]:
-    """Функция для определения количества страниц в пагинаторе ozon.
-
-    Args:
-        driver: используемый драйвер.
-        url: адрес главной страницы.
-
-    Returns:
-        Количество страниц в пагинаторе ozon.
-    """
-    html = get_html(driver, url, SELLER_PAGE_MARK)
-    pages_count = int(
-        re.search(  # type: ignore[union-attr]
-            r'"totalPages":(\d+)',
-            html,
-        )
-        .group(1)
-        .strip("'"),
-    )
-    logger.info(f'Обнаружено страниц: {pages_count}')
-    return pages_count, html
-
-
 def get_ozon_ids(soup: BeautifulSoup) -> List:
     """Функция для получения id товаров с сайта.
 
@@ -159,88 +190,6 @@ def get_ozon_ids(soup: BeautifulSoup) -> List:
     ]
 
 
-def get_new_products_on_page(
-    driver: uc.Chrome,
-    url: str,
-    created_ids: List[int],
-) -> List[int]:
-    """Метод получения новых продуктов на странице.
-
-    Args:
-        driver: используемый драйвер браузера.
-        url: требуемый адрес страницы.
-        created_ids: список созданных id объектов.
-
-    Returns:
-        Список новых продуктов
-    """
-    html = get_html(driver, url, SELLER_PAGE_MARK)
-    soup = BeautifulSoup(html, 'lxml')
-    ozon_ids = get_ozon_ids(soup)
-    return list(filter(lambda id: id not in created_ids, ozon_ids))
-
-
-def get_new_products_on_first_page(
-    html: str,
-    created_ids: List[int],
-) -> List[int]:
-    """Метод получения новых продуктов на главной странице.
-
-    Args:
-        html: html главной страницы.
-        created_ids: список созданных id объектов.
-
-    Returns:
-        Список новых продуктов
-    """
-    soup = BeautifulSoup(html, 'lxml')
-    ozon_ids = get_ozon_ids(soup)
-    return list(filter(lambda id: id not in created_ids, ozon_ids))
-
-
-def get_new_products(
-    driver: uc.Chrome,
-    url: str,
-    html: str,
-    pages_count: int,
-    products_count: int,
-) -> List[int]:
-    """Метод получения новых продуктов на сайте.
-
-    Args:
-        driver: используемый драйвер браузера.
-        url: адрес главной страницы.
-        products_count: необходимое количество новых продуктов.
-
-    Returns:
-        Список новых продуктов
-    """
-    created_ids = list(Product.objects.all().values_list('ozon_id', flat=True))
-    logger.info(f'Количество уже существующих товаров: {len(created_ids)}')
-
-    new_ids = get_new_products_on_first_page(
-        html,
-        created_ids,
-    )
-    logger.info(f'Количество новых элементов на странице: {len(new_ids)}')
-    if len(new_ids) >= products_count:
-        return new_ids[:products_count]
-    else:
-        for page in range(2, pages_count + 1):
-            added_ids = get_new_products_on_page(
-                driver,
-                url + f'?page={page}',
-                created_ids,
-            )
-            new_ids = extend_with_unique(new_ids, added_ids)
-            logger.info(
-                f'Количество новых элементов на странице: {len(new_ids)}',
-            )
-            if len(new_ids) >= products_count:
-                return new_ids[:products_count]
-        return new_ids
-
-
 def get_name(product_soup: BeautifulSoup) -> Optional[str]:
     """Метод получения имени продукта.
 
@@ -350,27 +299,32 @@ def get_description(product_soup: BeautifulSoup) -> Optional[str]:
 
 
 def get_product(
-    product_soup: BeautifulSoup,
+    product_html: str,
     product_id: int,
     request_date: datetime,
 ) -> ProductWriteSerializer:
     """Метод получения данных продукта в виде сериализатора.
 
+    Поля берутся из встроенного состояния страницы, а недостающие -
+    из разметки за один проход по плану DATA_TAGS. Скидка и валюта
+    дополнительно приводятся к числовым полям модели.
+
     Args:
-        product_soup: BeautifulSoup страницы продукта.
+        product_html: html страницы продукта.
         product_id: id товара на странице Ozon.
         request_date: дата создания запроса.
 
     Returns:
         ProductWriteSerializer с данными продукта.
     """
+    with metrics.span('extract.state'):
+        fields = get_state_fields(product_html)
+    if not fields.keys() >= PLAN_FIELDS.keys():
+        with metrics.span('extract.dom'):
+            fields = {**get_dom_fields(product_html), **fields}
     return ProductWriteSerializer(
         data={
-            'name': get_name(product_soup),
-            'image_url': get_image_url(product_soup),
-            'price': get_price(product_soup),
-            'discount': get_discount(product_soup),
-            'description': get_description(product_soup),
+            **normalize_fields(fields),
             'ozon_id': product_id,
             'request_date': request_date,
         },
@@ -0,0 +1,225 @@
+from datetime import datetime
+from time import time
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Tuple, Type
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.constants import PARSE_PLAN_TIMEOUT, WRITE_BATCH_SIZE
+from core.metrics import metrics
+from ozon_parser.celery import logger
+from products.models import PriceHistory, Product
+
+PRODUCTS_STATE_KEY = 'products:state'
+UPDATE_FIELDS = (
+    'name',
+    'price',
+    'description',
+    'image_url',
+    'discount',
+    'original_price',
+    'discount_percent',
+    'currency',
+    'request_date',
+)
+
+
+class ProductWriter:
+    """Запись продуктов в базу небольшими пачками по мере их получения.
+
+    Повторная запись продукта с тем же ozon_id обновляет его поля, поэтому
+    прерванную задачу можно безопасно продолжить. Для новых продуктов и
+    продуктов с изменившейся ценой или скидкой добавляется запись в
+    историю цен.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self.batch: List[Product] = []
+        self.saved = 0
+
+    def add(self, product: Product) -> None:
+        """Добавление продукта в очередь на запись.
+
+        Args:
+            product: несохраненный продукт.
+        """
+        self.batch.append(product)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Запись накопленных продуктов одним запросом."""
+        if not self.batch:
+            return
+        previous = {
+            ozon_id: (price, discount_percent)
+            for ozon_id, price, discount_percent in Product.objects.filter(
+                ozon_id__in=[product.ozon_id for product in self.batch],
+            )
+            .order_by()
+            .values_list('ozon_id', 'price', 'discount_percent')
+        }
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ('ozon_id',)
+        with metrics.span('write.bulk_create'), transaction.atomic():
+            Product.objects.bulk_create(
+                self.batch,
+                update_conflicts=True,
+                update_fields=UPDATE_FIELDS,
+                unique_fields=unique_fields,
+            )
+            PriceHistory.objects.bulk_create(
+                [
+                    PriceHistory(
+                        product_id=product.ozon_id,
+                        price=product.price,
+                        discount_percent=product.discount_percent,
+                        recorded_at=product.request_date,
+                    )
+                    for product in self.batch
+                    if previous.get(product.ozon_id)
+                    != (product.price, product.discount_percent)
+                ],
+            )
+            transaction.on_commit(invalidate_products)
+        self.saved += len(self.batch)
+        logger.info(f'Записано товаров: {self.saved}')
+        self.batch = []
+
+    def __enter__(self) -> 'ProductWriter':
+        """Начало блока записи.
+
+        Returns:
+            Этот же объект.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Запись оставшихся продуктов по выходу из блока.
+
+        Args:
+            exc_type: тип исключения.
+            exc_value: исключение.
+            traceback: трассировка.
+        """
+        self.flush()
+
+
+def new_products_state() -> Tuple[str, int]:
+    """Создание новой версии данных о продуктах.
+
+    Returns:
+        Версия и время ее создания в целых секундах от начала эпохи.
+    """
+    return uuid4().hex, int(time())
+
+
+def get_products_state() -> Tuple[str, int]:
+    """Получение версии данных о продуктах и времени их изменения.
+
+    Версия меняется после каждой записи продуктов и используется в
+    ключах кэша ответов API и в ETag, а время смены версии - в
+    Last-Modified. Оба значения хранятся в одном ключе, поэтому читаются
+    согласованно. Если версии в кэше нет, время берется текущее: все
+    записи к этому моменту уже завершены.
+
+    Returns:
+        Текущая версия и время изменения в целых секундах от начала
+        эпохи.
+    """
+    state = cache.get(PRODUCTS_STATE_KEY)
+    if state is None:
+        state = new_products_state()
+        if not cache.add(PRODUCTS_STATE_KEY, state, None):
+            state = cache.get(PRODUCTS_STATE_KEY, state)
+    return state
+
+
+def get_products_version() -> str:
+    """Получение версии данных о продуктах.
+
+    Returns:
+        Текущая версия, как в get_products_state.
+    """
+    return get_products_state()[0]
+
+
+def invalidate_products() -> None:
+    """Смена версии данных о продуктах после их записи.
+
+    Вызывается после фиксации транзакции, поэтому время смены версии не
+    раньше записи продуктов.
+    """
+    cache.set(PRODUCTS_STATE_KEY, new_products_state(), None)
+
+
+def get_plan_key(job_id: str) -> str:
+    """Ключ кэша со списком товаров задачи.
+
+    Args:
+        job_id: id задачи Celery.
+
+    Returns:
+        Ключ кэша.
+    """
+    return f'parse_plan:{job_id}'
+
+
+def save_plan(
+    job_id: Optional[str],
+    ozon_ids: List[int],
+    request_date: datetime,
+    refresh: bool = False,
+) -> None:
+    """Сохранение списка товаров задачи для возможного продолжения.
+
+    Args:
+        job_id: id задачи Celery.
+        ozon_ids: id товаров, которые задача должна сохранить.
+        request_date: дата создания запроса.
+        refresh: обновляет ли задача уже сохраненные товары.
+    """
+    if job_id is None:
+        return
+    cache.set(
+        get_plan_key(job_id),
+        {
+            'ozon_ids': ozon_ids,
+            'request_date': request_date,
+            'refresh': refresh,
+        },
+        PARSE_PLAN_TIMEOUT,
+    )
+
+
+def load_plan(job_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Получение списка товаров прерванной задачи.
+
+    Args:
+        job_id: id задачи Celery.
+
+    Returns:
+        Сохраненный план или None, если задача запущена впервые.
+    """
+    if job_id is None:
+        return None
+    return cache.get(get_plan_key(job_id))
+
+
+def clear_plan(job_id: Optional[str]) -> None:
+    """Удаление плана завершенной задачи.
+
+    Args:
+        job_id: id задачи Celery.
+    """
+    if job_id is not None:
+        cache.delete(get_plan_key(job_id))
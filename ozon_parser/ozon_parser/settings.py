@@ -118,3 +118,18 @@ CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3600}
 CELERY_RESULT_BACKEND = 'redis://' + REDIS_HOST + ':' + REDIS_PORT
 
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+
+PAGE_CACHE_URL = 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/2'
+
+NOTIFICATIONS_URL = 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/3'
+
+METRICS_URL = 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/4'
+
+PAGE_CORPUS_DIR = config('PAGE_CORPUS_DIR', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/1',
+    },
+}
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from core.admin import BaseAdmin
-from products.models import Product
+from products.models import PriceHistory, Product
 
 
 @admin.register(Product)
@@ -21,3 +21,18 @@ class ProductAdmin(BaseAdmin):
     readonly_fields = ('ozon_id',)
     search_fields = ('name',)
     list_filter = ('name', 'price')
+
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(BaseAdmin):
+    """Способ отображения истории цен в админке."""
+
+    list_display = (
+        'pk',
+        'product',
+        'price',
+        'discount_percent',
+        'recorded_at',
+    )
+    list_filter = ('recorded_at',)
+    search_fields = ('product__name',)
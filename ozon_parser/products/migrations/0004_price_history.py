@@ -0,0 +1,77 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0003_alter_product_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price", models.PositiveIntegerField(verbose_name="цена")),
+                (
+                    "discount",
+                    models.CharField(
+                        blank=True,
+                        max_length=50,
+                        null=True,
+                        verbose_name="скидка",
+                    ),
+                ),
+                (
+                    "recorded_at",
+                    models.DateTimeField(verbose_name="дата записи"),
+                ),
+            ],
+            options={
+                "verbose_name": "запись истории цены",
+                "verbose_name_plural": "история цен",
+                "ordering": ("-recorded_at",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["request_date"], name="products_pr_request_80c4f9_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="pricehistory",
+            name="product",
+            field=models.ForeignKey(
+                db_column="ozon_id",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="price_history",
+                to="products.product",
+                to_field="ozon_id",
+                verbose_name="продукт",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pricehistory",
+            index=models.Index(
+                fields=["product", "recorded_at"],
+                name="products_pr_ozon_id_085787_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pricehistory",
+            index=models.Index(
+                fields=["recorded_at"], name="products_pr_recorde_b1d7b3_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0004_price_history"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="product",
+            options={
+                "ordering": ("name", "price", "id"),
+                "verbose_name": "продукт",
+                "verbose_name_plural": "продукты",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["name", "price", "id"],
+                name="products_pr_name_2b665b_idx",
+            ),
+        ),
+    ]
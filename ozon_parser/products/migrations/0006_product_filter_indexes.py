@@ -0,0 +1,54 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:32
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+def add_search_index(
+    apps: StateApps,
+    schema_editor: BaseDatabaseSchemaEditor,
+) -> None:
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            "ALTER TABLE products_product ADD FULLTEXT INDEX "
+            "products_product_search_idx (name, description)"
+        )
+
+
+def remove_search_index(
+    apps: StateApps,
+    schema_editor: BaseDatabaseSchemaEditor,
+) -> None:
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            "ALTER TABLE products_product DROP INDEX "
+            "products_product_search_idx"
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0005_product_ordering_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["request_date", "price"],
+                name="products_pr_request_e3fa80_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_pr_request_80c4f9_idx",
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["price"], name="products_pr_price_9b1a5f_idx"
+            ),
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:34
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0006_product_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="currency",
+            field=models.CharField(
+                default="RUB", max_length=3, verbose_name="валюта"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="discount_percent",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                null=True,
+                validators=[django.core.validators.MaxValueValidator(100)],
+                verbose_name="скидка в процентах",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="original_price",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="цена без скидки"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["discount_percent", "price"],
+                name="products_pr_discoun_c2f272_idx",
+            ),
+        ),
+    ]
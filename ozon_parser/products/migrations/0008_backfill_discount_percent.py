@@ -0,0 +1,56 @@
+import re
+
+from django.db import migrations, transaction
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+BATCH_SIZE = 1000
+DISCOUNT_RE = re.compile(r"\d+")
+
+
+def backfill_discount_percent(
+    apps: StateApps,
+    schema_editor: BaseDatabaseSchemaEditor,
+) -> None:
+    """Заполнение скидки в процентах по строковой скидке.
+
+    Строки обрабатываются пачками по возрастанию первичного ключа, и
+    каждая пачка записывается в отдельной короткой транзакции, поэтому
+    таблица не блокируется на все время миграции.
+    """
+    Product = apps.get_model("products", "Product")
+    last_id = 0
+    while True:
+        batch = list(
+            Product.objects.filter(
+                id__gt=last_id,
+                discount__isnull=False,
+                discount_percent__isnull=True,
+            )
+            .exclude(discount="")
+            .order_by("id")
+            .only("id", "discount")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for product in batch:
+            match = DISCOUNT_RE.search(product.discount)
+            product.discount_percent = int(match.group()) if match else None
+        with transaction.atomic():
+            Product.objects.bulk_update(batch, ("discount_percent",))
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("products", "0007_product_numeric_prices"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_discount_percent,
+            migrations.RunPython.noop,
+        ),
+    ]
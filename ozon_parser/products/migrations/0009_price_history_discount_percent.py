@@ -0,0 +1,68 @@
+# Generated by Django 4.2.6 on 2026-10-18 17:09
+
+import re
+
+import django.core.validators
+from django.db import migrations, models, transaction
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+BATCH_SIZE = 1000
+DISCOUNT_RE = re.compile(r"\d+")
+
+
+def backfill_discount_percent(
+    apps: StateApps,
+    schema_editor: BaseDatabaseSchemaEditor,
+) -> None:
+    """Заполнение скидки в процентах в истории цен по строковой скидке.
+
+    Записи обрабатываются пачками по возрастанию первичного ключа, как в
+    0008_backfill_discount_percent.
+    """
+    PriceHistory = apps.get_model("products", "PriceHistory")
+    last_id = 0
+    while True:
+        batch = list(
+            PriceHistory.objects.filter(id__gt=last_id, discount__isnull=False)
+            .exclude(discount="")
+            .order_by("id")
+            .only("id", "discount")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for record in batch:
+            match = DISCOUNT_RE.search(record.discount)
+            record.discount_percent = int(match.group()) if match else None
+        with transaction.atomic():
+            PriceHistory.objects.bulk_update(batch, ("discount_percent",))
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("products", "0008_backfill_discount_percent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pricehistory",
+            name="discount_percent",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                null=True,
+                validators=[django.core.validators.MaxValueValidator(100)],
+                verbose_name="скидка в процентах",
+            ),
+        ),
+        migrations.RunPython(
+            backfill_discount_percent,
+            migrations.RunPython.noop,
+        ),
+        migrations.RemoveField(
+            model_name="pricehistory",
+            name="discount",
+        ),
+    ]
@@ -1,4 +1,149 @@
-from django.db import models
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.validators import MaxValueValidator
+from django.db import connection, models
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models.sql.compiler import SQLCompiler
+
+from core.constants import DEFAULT_CURRENCY, PRODUCTS_ORDERING
+
+
+class FullTextMatch(models.Func):
+    """Релевантность полнотекстового поиска MySQL MATCH ... AGAINST."""
+
+    template = 'MATCH (%(expressions)s) AGAINST (%%s IN NATURAL LANGUAGE MODE)'
+    output_field = models.FloatField()
+
+    def __init__(self, query: str, *expressions: Any) -> None:
+        super().__init__(*expressions)
+        self.query = query
+
+    def as_sql(
+        self,
+        compiler: SQLCompiler,
+        connection: BaseDatabaseWrapper,
+        function: Optional[str] = None,
+        template: Optional[str] = None,
+        arg_joiner: Optional[str] = None,
+        **extra_context: Any,
+    ) -> Tuple[str, List[Any]]:
+        """Формирование SQL с запросом в качестве параметра.
+
+        Args:
+            compiler: компилятор запроса.
+            connection: соединение с базой.
+            function: имя функции вместо заданного в классе.
+            template: шаблон вместо заданного в классе.
+            arg_joiner: разделитель выражений вместо заданного в классе.
+            extra_context: дополнительные параметры шаблона.
+
+        Returns:
+            SQL и его параметры.
+        """
+        sql, params = super().as_sql(
+            compiler,
+            connection,
+            function,
+            template,
+            arg_joiner,
+            **extra_context,
+        )
+        return sql, [*params, self.query]
+
+
+class ProductQuerySet(models.QuerySet):
+    """Запросы к продуктам."""
+
+    def search(self, query: str) -> 'ProductQuerySet':
+        """Поиск продуктов по имени и описанию.
+
+        В MySQL используется полнотекстовый индекс, в остальных базах -
+        поиск подстроки.
+
+        Args:
+            query: поисковый запрос.
+
+        Returns:
+            Найденные продукты.
+        """
+        if connection.vendor != 'mysql':
+            return self.filter(
+                models.Q(name__icontains=query)
+                | models.Q(description__icontains=query),
+            )
+        return self.alias(
+            relevance=FullTextMatch(query, 'name', 'description'),
+        ).filter(relevance__gt=0)
+
+    def iter_batches(
+        self,
+        fields: Iterable[str],
+        batch_size: int,
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        """Чтение значений полей продуктов пачками по первичному ключу.
+
+        Каждая пачка выбирается отдельным запросом с условием на id,
+        поэтому в памяти находится не больше batch_size строк даже
+        в MySQL, где результат запроса загружается клиентом целиком.
+
+        Args:
+            fields: имена полей.
+            batch_size: количество строк в пачке.
+
+        Yields:
+            Списки кортежей значений полей.
+        """
+        fields = tuple(fields)
+        queryset = self.order_by('id').values_list('id', *fields)
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return
+            last_id = batch[-1][0]
+            yield [row[1:] for row in batch]
+
+    def batch_stats(self) -> 'ProductQuerySet':
+        """Статистика цен по пачкам, сохраненным одним запросом.
+
+        Returns:
+            Словари с датой запроса, количеством продуктов, количеством
+            продуктов со скидкой и минимальной, максимальной и средней
+            ценой, начиная с последней пачки.
+        """
+        return (
+            self.order_by()
+            .values('request_date')
+            .annotate(**self.get_stats_expressions())
+            .order_by('-request_date')
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика цен по всем продуктам.
+
+        Returns:
+            Количество продуктов, количество продуктов со скидкой и
+            минимальная, максимальная и средняя цена.
+        """
+        return self.order_by().aggregate(**self.get_stats_expressions())
+
+    @staticmethod
+    def get_stats_expressions() -> Dict[str, Any]:
+        """Агрегаты, из которых состоит статистика.
+
+        Returns:
+            Словарь агрегатов по именам.
+        """
+        return {
+            'count': models.Count('id'),
+            'discounted': models.Count(
+                'id',
+                filter=models.Q(discount_percent__gt=0),
+            ),
+            'min_price': models.Min('price'),
+            'max_price': models.Max('price'),
+            'avg_price': models.Avg('price'),
+        }
 
 
 class Product(models.Model):
@@ -19,13 +164,37 @@ class Product(models.Model):
         blank=True,
         null=True,
     )
+    original_price = models.PositiveIntegerField(
+        verbose_name='цена без скидки',
+        blank=True,
+        null=True,
+    )
+    discount_percent = models.PositiveSmallIntegerField(
+        verbose_name='скидка в процентах',
+        validators=(MaxValueValidator(100),),
+        blank=True,
+        null=True,
+    )
+    currency = models.CharField(
+        max_length=3,
+        verbose_name='валюта',
+        default=DEFAULT_CURRENCY,
+    )
     ozon_id = models.IntegerField(verbose_name='id продукта', unique=True)
     request_date = models.DateTimeField()
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
-        ordering = ('name', 'price')
+        ordering = PRODUCTS_ORDERING
         verbose_name = 'продукт'
         verbose_name_plural = 'продукты'
+        indexes = (
+            models.Index(fields=('request_date', 'price')),
+            models.Index(fields=PRODUCTS_ORDERING),
+            models.Index(fields=('price',)),
+            models.Index(fields=('discount_percent', 'price')),
+        )
 
     def __str__(self) -> str:
         """Представление модели при выводе.
@@ -34,3 +203,41 @@ class Product(models.Model):
             Строка поля name, используемого для представления модели.
         """
         return self.name
+
+
+class PriceHistory(models.Model):
+    """Модель записи истории цены продукта."""
+
+    product = models.ForeignKey(
+        Product,
+        to_field='ozon_id',
+        db_column='ozon_id',
+        on_delete=models.CASCADE,
+        related_name='price_history',
+        verbose_name='продукт',
+    )
+    price = models.PositiveIntegerField(verbose_name='цена')
+    discount_percent = models.PositiveSmallIntegerField(
+        verbose_name='скидка в процентах',
+        validators=(MaxValueValidator(100),),
+        blank=True,
+        null=True,
+    )
+    recorded_at = models.DateTimeField(verbose_name='дата записи')
+
+    class Meta:
+        ordering = ('-recorded_at',)
+        verbose_name = 'запись истории цены'
+        verbose_name_plural = 'история цен'
+        indexes = (
+            models.Index(fields=('product', 'recorded_at')),
+            models.Index(fields=('recorded_at',)),
+        )
+
+    def __str__(self) -> str:
+        """Представление модели при выводе.
+
+        Returns:
+            Строка с ценой продукта на дату записи.
+        """
+        return f'{self.product_id}: {self.price} ({self.recorded_at})'
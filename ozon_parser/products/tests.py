@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from products.models import Product
+
+
+def create_products(count: int) -> None:
+    """Создание продуктов двумя пачками с разной датой запроса.
+
+    Args:
+        count: количество продуктов.
+    """
+    now = timezone.now()
+    Product.objects.bulk_create(
+        Product(
+            name=f'Товар {index}',
+            price=100 + index,
+            description='Подарочная упаковка' if index % 2 else '',
+            image_url=f'https://example.com/{index}.jpg',
+            discount_percent=10 if index % 3 == 0 else None,
+            ozon_id=index,
+            request_date=now - timedelta(days=index % 2),
+        )
+        for index in range(1, count + 1)
+    )
+
+
+class ProductQuerySetTests(TestCase):
+    """Количество запросов к базе в методах ProductQuerySet."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Создание продуктов для всех тестов."""
+        create_products(7)
+
+    def test_search_is_one_query(self) -> None:
+        """Поиск выполняется одним запросом."""
+        with self.assertNumQueries(1):
+            names = list(
+                Product.objects.search('упаковка').values_list(
+                    'name',
+                    flat=True,
+                ),
+            )
+        self.assertEqual(len(names), 4)
+
+    def test_iter_batches_is_one_query_per_batch(self) -> None:
+        """Каждая пачка выбирается отдельным запросом.
+
+        Последний запрос возвращает пустую пачку и завершает чтение.
+        """
+        with self.assertNumQueries(4):
+            batches = list(Product.objects.iter_batches(('ozon_id',), 3))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(
+            [row[0] for batch in batches for row in batch],
+            list(range(1, 8)),
+        )
+
+    def test_stats_is_one_query(self) -> None:
+        """Статистика по всем продуктам считается одним запросом."""
+        with self.assertNumQueries(1):
+            stats = Product.objects.stats()
+        self.assertEqual(stats['count'], 7)
+        self.assertEqual(stats['discounted'], 2)
+        self.assertEqual(stats['min_price'], 101)
+        self.assertEqual(stats['max_price'], 107)
+
+    def test_batch_stats_is_one_query(self) -> None:
+        """Статистика по пачкам считается одним запросом."""
+        with self.assertNumQueries(1):
+            batches = list(Product.objects.batch_stats())
+        self.assertEqual([batch['count'] for batch in batches], [3, 4])
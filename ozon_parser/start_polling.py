@@ -6,7 +6,6 @@ from telegram import Update
 from telegram.ext import Application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ozon_parser.settings')
-os.environ['DJANGO_ALLOW_ASYNC_UNSAFE'] = 'true'
 django.setup()
 
 from bot.bot import TOKEN